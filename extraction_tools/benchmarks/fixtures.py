@@ -0,0 +1,172 @@
+import os
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import DefaultClause, MetaData, event, insert
+
+from src.extraction_tools.infra.orm import ORM
+from src.extraction_tools.infra.schema import Issue, IssueTagMatch, TagFull, Language, Difficulty, Question, \
+    QuestionData, Option, OptionData, CategoryEnum, TemplateEnum, DifficultyEnum, Status
+
+# exam, exam_paper 는 없는 테이블 (certifacation) 을 참조하므로 만들지 않는다
+TABLES = [
+    Issue.__table__, IssueTagMatch.__table__, TagFull.__table__, Language.__table__, Difficulty.__table__,
+    Question.__table__, QuestionData.__table__, Option.__table__, OptionData.__table__
+]
+ROTATIONS = (45, 90)
+POSITIONS = ("top", "side")
+
+
+class QueryCounter:
+    def __init__(self, orm: ORM):
+        """
+        orm 엔진에서 실행된 쿼리 수를 센다
+        """
+        self.count = 0
+        event.listen(orm._engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def reset(self) -> int:
+        count, self.count = self.count, 0
+        return count
+
+
+def make_sqlite_orm(path: str) -> ORM:
+    """
+    schema 테이블을 가진 SQLite ORM 을 만든다
+        question.made_by 는 서비스에서 넣지 않으므로 (merge_question 은 None) MySQL 의 strict 가 아닌 모드처럼
+        NULL 을 허용하고 "" 을 기본값으로 둔다
+        테이블 복사본의 DDL 에만 적용한다 (schema 의 Question 테이블을 바꾸면 같은 프로세스의 다른 엔진에도 적용된다)
+    """
+    orm = ORM("", "", "", 0, "", url=f"sqlite:///{path}?check_same_thread=false")
+    metadata = MetaData()
+    tables = [table.to_metadata(metadata) for table in TABLES]
+    made_by = metadata.tables[Question.__tablename__].c.made_by
+    made_by.nullable = True
+    made_by.server_default = DefaultClause("")
+    metadata.create_all(orm._engine, tables=tables)
+    return orm
+
+
+def seed_issues(orm: ORM, issues: int, start: datetime, tags: int = 100, chunk_size: int = 5000) -> list[dict]:
+    """
+    샘플 이슈 (회전 0, 45, 90) 와 태그를 만든다
+        issues 개의 이슈를 start 부터 1시간 간격으로 만든다
+    @return: 회전을 포함한 모든 샘플 이슈 [{issue_code, rotate, tag_code}]
+    """
+    rows, matches, samples = [], [], []
+    for i in range(issues):
+        created_at = start + timedelta(hours=i)
+        tag_code = f"T{i % tags}"
+        for rotate in (0, *ROTATIONS):
+            issue_code = f"I{i}" if rotate == 0 else f"I{i}_{rotate}"
+            rows.append({
+                "issue_code": issue_code, "difficulty": 1, "created_at": created_at, "complete": "",
+                "description": "", "xray_type": "", "is_package": "1", "rotate": rotate,
+                "package_link": "" if rotate == 0 else f"I{i}", "label_status": Status.done,
+                "label_status_updated_at": created_at, "updated_at": created_at
+            })
+            matches.append({"issue_code": issue_code, "tag_code": tag_code})
+            samples.append({"issue_code": issue_code, "rotate": rotate, "tag_code": tag_code})
+    tag_rows = [
+        {
+            "tag_code": f"T{i}", "tag_name": f"tag{i}", "description": "", "barcode": f"B{i}",
+            "link_barcode": f"L{i}", "tag_type": "sample", "obj_type": "", "battery_code": "",
+            "created_at": start, "updated_at": start
+        }
+        for i in range(tags)
+    ]
+    with orm._engine.begin() as conn:
+        for table, values in (Issue.__table__, rows), (IssueTagMatch.__table__, matches), (TagFull.__table__, tag_rows):
+            for i in range(0, len(values), chunk_size):
+                conn.execute(insert(table), values[i:i + chunk_size])
+    return samples
+
+
+def seed_difficulty(orm: ORM) -> list[int]:
+    # 난이도 (상, 중, 하) 를 만든다, merge_exam_data 의 대상 DB 에도 필요하다
+    with orm._engine.begin() as conn:
+        conn.execute(insert(Difficulty.__table__), [{"name": name, "created_at": datetime.now()} for name in DifficultyEnum])
+        return [row.seq for row in conn.execute(Difficulty.__table__.select())]
+
+
+def seed_exam(orm: ORM, questions: int, options: int = 4, images: int | None = None,
+              seed: int = 0) -> list[str]:
+    """
+    문제, 문제 이미지, 옵션, 옵션 이미지를 만든다
+        문제 이미지는 images 개의 이미지를 나눠 쓰고 (중복 이미지), 옵션 이미지의 마지막은 Chip 이미지로 만든다
+    @return: 사용한 이미지 id 목록
+    """
+    rng = random.Random(seed)
+    images = images or max(1, questions // 2)
+    now = datetime.now()
+    image_ids = set()
+    difficulty_seqs = seed_difficulty(orm)
+    with orm._engine.begin() as conn:
+        for i in range(questions):
+            title_seq = conn.execute(insert(Language.__table__).values(kr=f"title{i}", en="", created_at=now)).lastrowid
+            solution_seq = conn.execute(insert(Language.__table__).values(kr=f"solution{i}", en="", created_at=now)).lastrowid
+            question_seq = conn.execute(insert(Question.__table__).values(
+                title_seq=title_seq, category=rng.choice(list(CategoryEnum)), template=rng.choice(list(TemplateEnum)),
+                difficulty_seq=rng.choice(difficulty_seqs), solution_seq=solution_seq, made_by="bench", created_at=now
+            )).lastrowid
+            image_id = f"Q{rng.randrange(images)}"
+            image_ids.add(image_id)
+            conn.execute(insert(QuestionData.__table__).values(
+                question_seq=question_seq, image_id=image_id, filter="default", is_main_image=True, created_at=now
+            ))
+            option_seqs = []
+            for j in range(options):
+                text_seq = conn.execute(insert(Language.__table__).values(kr=f"option{j}", en="", created_at=now)).lastrowid
+                option_seq = conn.execute(insert(Option.__table__).values(
+                    question_seq=question_seq, included_text_seq=text_seq, created_at=now
+                )).lastrowid
+                option_image_id = f"O{i}_{j}" + ("Chip" if j == options - 1 else "")
+                image_ids.add(option_image_id)
+                conn.execute(insert(OptionData.__table__).values(
+                    option_seq=option_seq, image_id=option_image_id, filter="default", created_at=now
+                ))
+                option_seqs.append(option_seq)
+            conn.execute(Question.__table__.update().where(Question.__table__.c.seq == question_seq).values(
+                correct_answer_seq=rng.choice(option_seqs)
+            ))
+    return sorted(image_ids)
+
+
+def generate_sample_tree(root: str, samples: list[dict], file_size: int, missing_ratio: float = 0.0,
+                         seed: int = 0) -> int:
+    """
+    {root}/{issue_code}/{position}/color.jpg 구조의 이미지를 만든다
+    missing_ratio: 만들지 않을 이미지 비율 (원격지에 없는 파일)
+    @return: 만든 파일 수
+    """
+    rng = random.Random(seed)
+    payload = os.urandom(file_size)
+    count = 0
+    for sample in samples:
+        for position in POSITIONS:
+            if rng.random() < missing_ratio:
+                continue
+            directory = os.path.join(root, sample["issue_code"], position)
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, "color.jpg"), "wb") as f:
+                f.write(payload)
+            count += 1
+    return count
+
+
+def generate_exam_tree(root: str, image_ids: list[str], file_size: int, files_per_image: int = 2) -> int:
+    """
+    {root}/{image_id}/{n}.png 구조의 이미지를 만든다
+    @return: 만든 파일 수
+    """
+    payload = os.urandom(file_size)
+    for image_id in image_ids:
+        directory = os.path.join(root, image_id)
+        os.makedirs(directory, exist_ok=True)
+        for n in range(files_per_image):
+            with open(os.path.join(directory, f"{n}.png"), "wb") as f:
+                f.write(payload)
+    return len(image_ids) * files_per_image
@@ -0,0 +1,235 @@
+"""
+로컬 SFTP 서버와 SQLite 로 주요 흐름의 처리 시간을 측정한다
+
+    extraction_tools 폴더에서 실행
+    python -m benchmarks.run --issues 2000 --questions 500 --file-size 65536 --output bench.json
+
+결과는 JSON 으로 출력한다 (서비스의 진행 출력은 stderr 로 보낸다)
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.fixtures import QueryCounter, make_sqlite_orm, seed_issues, seed_exam, seed_difficulty, \
+    generate_sample_tree, generate_exam_tree
+from benchmarks.sftp_server import LocalSFTPServer
+from src.extraction_tools.client.ssh_client import SSHClient
+from src.extraction_tools.service.data_handling_service import DataHandlingService
+from src.extraction_tools.service.exam_build_service import ExamBuildService
+from src.extraction_tools.service.image_extract_service import ImageExtractService
+from src.extraction_tools.service.image_upload_service import ImageUploadService
+from src.extraction_tools.util.date_util import DateUtil
+from src.extraction_tools.util.directory_util import DirectoryUtil
+from src.extraction_tools.util.metrics import METRICS
+
+START = datetime(2024, 1, 1)
+SAMPLE_DIR = "samples"
+EXAM_DIR = "exam_images"
+
+
+class BenchmarkRunner:
+    def __init__(self, work_dir: str, issues: int, questions: int, file_size: int, missing_ratio: float,
+                 max_channels: int):
+        """
+        work_dir: 원격지 이미지, SQLite 파일, 다운로드 결과를 둘 폴더
+        issues: 샘플 이슈 수 (회전 45, 90 을 포함해 이슈마다 3건, 이미지는 건마다 top, side 2장)
+        questions: 문제 수 (옵션 4개)
+        file_size: 이미지 파일 크기 (byte)
+        missing_ratio: 원격지에 만들지 않을 샘플 이미지 비율
+        max_channels: SSHClient 의 SFTP 채널 수
+        """
+        self.work_dir = work_dir
+        self.issues = issues
+        self.questions = questions
+        self.file_size = file_size
+        self.missing_ratio = missing_ratio
+        self.max_channels = max_channels
+        self.remote_root = os.path.join(work_dir, "remote")
+        self.results: list[dict] = []
+
+    def setup(self) -> dict:
+        started = time.perf_counter()
+        self.db = make_sqlite_orm(os.path.join(self.work_dir, "source.db"))
+        self.exam_db = make_sqlite_orm(os.path.join(self.work_dir, "exam.db"))
+        samples = seed_issues(self.db, self.issues, START)
+        image_ids = seed_exam(self.exam_db, self.questions)
+        sample_files = generate_sample_tree(os.path.join(self.remote_root, SAMPLE_DIR), samples, self.file_size,
+                                            self.missing_ratio)
+        exam_files = generate_exam_tree(os.path.join(self.remote_root, EXAM_DIR), image_ids, self.file_size)
+        self.target_date = DateUtil().search_all_date(START, START + timedelta(hours=self.issues))
+        self.db_queries = QueryCounter(self.db)
+        self.exam_db_queries = QueryCounter(self.exam_db)
+        return {
+            "seconds": round(time.perf_counter() - started, 3),
+            "sample_rows": len(samples),
+            "sample_files": sample_files,
+            "exam_files": exam_files
+        }
+
+    def _ssh_client(self, port: int) -> SSHClient:
+        return SSHClient("127.0.0.1", "bench", "bench", max_channels=self.max_channels, port=port)
+
+    def _output_dir(self, name: str) -> str:
+        path = os.path.join(self.work_dir, "output", name)
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+        return path
+
+    @staticmethod
+    def _directory_size(path: str) -> tuple[int, int]:
+        files = size = 0
+        for directory, _, names in os.walk(path):
+            for name in names:
+                files += 1
+                size += os.path.getsize(os.path.join(directory, name))
+        return files, size
+
+    def _record(self, name: str, seconds: float, queries: int, items: int, unit: str, output: str = None):
+        result = {
+            "name": name,
+            "seconds": round(seconds, 4),
+            "queries": queries,
+            unit: items,
+            f"{unit}_per_sec": round(items / seconds, 2) if seconds else None
+        }
+        if output is not None:
+            files, size = self._directory_size(output)
+            result["files"] = files
+            result["bytes"] = size
+            result["mb_per_sec"] = round(size / seconds / 2 ** 20, 3) if seconds else None
+        self.results.append(result)
+
+    async def bench_upload_all_sample_images(self, port: int, use_tar: bool):
+        output = self._output_dir(f"sample_{'tar' if use_tar else 'sftp'}")
+        ssh_client = self._ssh_client(port)
+        service = ImageUploadService(DirectoryUtil(), ssh_client, self.db)
+        self.db_queries.reset()
+        started = time.perf_counter()
+        await service.upload_all_sample_images(self.target_date, SAMPLE_DIR, output, use_tar=use_tar)
+        seconds = time.perf_counter() - started
+        ssh_client.close()
+        files, _ = self._directory_size(output)
+        self._record(f"upload_all_sample_images[{'tar' if use_tar else 'sftp'}]", seconds,
+                     self.db_queries.reset(), files, "files", output)
+
+    async def bench_extract_target_questions_and_option_images(self, port: int):
+        output = self._output_dir("exam_images")
+        ssh_client = self._ssh_client(port)
+        service = ImageExtractService(self.exam_db, DirectoryUtil(), ssh_client)
+        self.exam_db_queries.reset()
+        started = time.perf_counter()
+        await service.extract_target_questions_and_option_images(f"{EXAM_DIR}/", f"{output}/")
+        seconds = time.perf_counter() - started
+        ssh_client.close()
+        files, _ = self._directory_size(output)
+        self._record("extract_target_questions_and_option_images", seconds, self.exam_db_queries.reset(),
+                     files, "files", output)
+
+    def bench_find_missing_sample(self):
+        service = DataHandlingService(DirectoryUtil(), self.db)
+        output_path = os.path.join(self._output_dir("missing_sample"), "missing_sample.xlsx")
+        self.db_queries.reset()
+        METRICS.reset()
+        started = time.perf_counter()
+        service.find_missing_sample(self.target_date, output_path)
+        seconds = time.perf_counter() - started
+        self._record("find_missing_sample", seconds, self.db_queries.reset(), self.issues, "issues")
+        # 단계별 (fetch, merge_tags, merge_rotations, save_excel) 소요 시간
+        self.results[-1]["stages"] = {
+            histogram["labels"]["stage"].split(".", 1)[1]: histogram["sum"]
+            for histogram in METRICS.snapshot()["histograms"]
+            if histogram["name"] == "stage_seconds"
+            and histogram["labels"].get("stage", "").startswith("find_missing_sample.")
+        }
+
+    def bench_exam_data(self):
+        path = os.path.join(self._output_dir("exam_data"), "exam_data.ndjson")
+        self.exam_db_queries.reset()
+        started = time.perf_counter()
+        count = ExamBuildService(self.exam_db).export_exam_data(path)
+        self._record("extract_exam_data", time.perf_counter() - started, self.exam_db_queries.reset(),
+                     count, "questions")
+
+        target_db = make_sqlite_orm(os.path.join(self.work_dir, "output", "exam_data", "target.db"))
+        seed_difficulty(target_db)
+        target_queries = QueryCounter(target_db)
+        service = ExamBuildService(target_db)
+        started = time.perf_counter()
+        service.merge_exam_data(service.load_exam_data(path), bulk=True)
+        self._record("merge_exam_data", time.perf_counter() - started, target_queries.reset(), count, "questions")
+
+    async def _guard(self, name: str, coroutine):
+        # 한 흐름이 실패해도 나머지 흐름은 측정하고, 실패한 흐름은 결과에 error 로 남긴다
+        try:
+            await coroutine
+        except Exception as e:
+            print(f"Failed to benchmark {name}")
+            print(f"reason {e!r}")
+            self.results.append({"name": name, "error": repr(e)})
+
+    async def run(self) -> dict:
+        setup = self.setup()
+        with LocalSFTPServer(self.remote_root) as server:
+            await self._guard("upload_all_sample_images[tar]",
+                              self.bench_upload_all_sample_images(server.port, use_tar=True))
+            await self._guard("upload_all_sample_images[sftp]",
+                              self.bench_upload_all_sample_images(server.port, use_tar=False))
+            await self._guard("extract_target_questions_and_option_images",
+                              self.bench_extract_target_questions_and_option_images(server.port))
+        await self._guard("find_missing_sample", asyncio.to_thread(self.bench_find_missing_sample))
+        await self._guard("exam_data", asyncio.to_thread(self.bench_exam_data))
+        return {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "params": {
+                "issues": self.issues,
+                "questions": self.questions,
+                "file_size": self.file_size,
+                "missing_ratio": self.missing_ratio,
+                "max_channels": self.max_channels
+            },
+            "setup": setup,
+            "results": self.results
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="extraction_tools benchmark")
+    parser.add_argument("--issues", type=int, default=1000)
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--file-size", type=int, default=64 * 1024)
+    parser.add_argument("--missing-ratio", type=float, default=0.1)
+    parser.add_argument("--max-channels", type=int, default=8)
+    parser.add_argument("--work-dir", default=None, help="없으면 임시 폴더를 만들고 끝나면 지운다")
+    parser.add_argument("--output", default="-", help="결과 JSON 파일 경로 (- 이면 stdout)")
+    args = parser.parse_args()
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="extraction_bench_")
+    try:
+        runner = BenchmarkRunner(work_dir, args.issues, args.questions, args.file_size, args.missing_ratio,
+                                 args.max_channels)
+        # 서비스가 현재 폴더에 만드는 파일 (download_path 폴더 등) 도 work_dir 에 둔다
+        with contextlib.redirect_stdout(sys.stderr), contextlib.chdir(work_dir):
+            report = asyncio.run(runner.run())
+    finally:
+        if args.work_dir is None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.output == "-":
+        json.dump(report, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+        return
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
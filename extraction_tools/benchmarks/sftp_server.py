@@ -0,0 +1,150 @@
+import os
+import socket
+import subprocess
+import threading
+
+import paramiko
+from paramiko import SFTPServer, SFTPAttributes, SFTPHandle, SFTPServerInterface, ServerInterface, \
+    AUTH_SUCCESSFUL, OPEN_SUCCEEDED, OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED, SFTP_OK
+
+
+class _Handle(SFTPHandle):
+    def stat(self):
+        try:
+            return SFTPAttributes.from_stat(os.fstat(self.readfile.fileno()))
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+
+
+class _LocalSFTP(SFTPServerInterface):
+    # root 폴더를 원격지의 "/" 로 보여준다
+    def __init__(self, server, root: str, *args, **kwargs):
+        super().__init__(server, *args, **kwargs)
+        self._root = root
+
+    def _local_path(self, path: str) -> str:
+        return os.path.join(self._root, self.canonicalize(path).lstrip("/"))
+
+    def list_folder(self, path):
+        local_path = self._local_path(path)
+        try:
+            result = []
+            for name in os.listdir(local_path):
+                attr = SFTPAttributes.from_stat(os.stat(os.path.join(local_path, name)))
+                attr.filename = name
+                result.append(attr)
+            return result
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+
+    def stat(self, path):
+        try:
+            return SFTPAttributes.from_stat(os.stat(self._local_path(path)))
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+
+    lstat = stat
+
+    def open(self, path, flags, attr):
+        try:
+            fd = os.open(self._local_path(path), flags, 0o666)
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+        if flags & (os.O_WRONLY | os.O_RDWR) == 0:
+            mode = "rb"
+        elif flags & os.O_APPEND:
+            mode = "ab"
+        else:
+            mode = "r+b" if flags & os.O_RDWR else "wb"
+        handle = _Handle(flags)
+        handle.filename = path
+        handle.readfile = handle.writefile = os.fdopen(fd, mode)
+        return handle
+
+    def mkdir(self, path, attr):
+        try:
+            os.mkdir(self._local_path(path))
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+        return SFTP_OK
+
+
+class _PasswordServer(ServerInterface):
+    # 모든 비밀번호를 허용하고, exec 요청 (find, tar) 은 root 폴더에서 실행한다
+    def __init__(self, root: str):
+        self._root = root
+
+    def get_allowed_auths(self, username):
+        return "password"
+
+    def check_auth_password(self, username, password):
+        return AUTH_SUCCESSFUL
+
+    def check_channel_request(self, kind, chanid):
+        if kind == "session":
+            return OPEN_SUCCEEDED
+        return OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_exec_request(self, channel, command):
+        threading.Thread(target=self._exec, args=(channel, command.decode()), daemon=True).start()
+        return True
+
+    def _exec(self, channel: paramiko.Channel, command: str):
+        process = subprocess.Popen(command, shell=True, cwd=self._root,
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        for chunk in iter(lambda: process.stdout.read(65536), b""):
+            channel.sendall(chunk)
+        error = process.stderr.read()
+        if error:
+            channel.sendall_stderr(error)
+        channel.send_exit_status(process.wait())
+        channel.close()
+
+
+class LocalSFTPServer:
+    def __init__(self, root: str, host: str = "127.0.0.1", port: int = 0):
+        """
+        벤치마크용 프로세스 내 SFTP 서버 (paramiko)
+        root: 원격지의 "/" 로 사용할 로컬 폴더
+        port: 0 이면 빈 포트를 사용한다 (start 후 self.port)
+        """
+        self.root = root
+        self.host = host
+        self.port = port
+        self._key = paramiko.RSAKey.generate(2048)
+        self._socket: socket.socket | None = None
+        self._transports: list[paramiko.Transport] = []
+
+    def start(self) -> int:
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind((self.host, self.port))
+        self._socket.listen(100)
+        self.port = self._socket.getsockname()[1]
+        threading.Thread(target=self._serve, daemon=True).start()
+        return self.port
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self._socket.accept()
+            except OSError:
+                return
+            transport = paramiko.Transport(conn)
+            transport.add_server_key(self._key)
+            transport.set_subsystem_handler("sftp", SFTPServer, _LocalSFTP, self.root)
+            transport.start_server(server=_PasswordServer(self.root))
+            self._transports.append(transport)
+
+    def close(self):
+        if self._socket is not None:
+            self._socket.close()
+        for transport in self._transports:
+            transport.close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -1,36 +1,181 @@
 import asyncio
 import os
+import posixpath
+import queue
+import shlex
+import shutil
+import tarfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from collections.abc import Iterable
+from contextlib import contextmanager
 
 import paramiko
 from stat import S_ISDIR
 
+from src.extraction_tools.dto.Vo import RemoteFileVo
+from src.extraction_tools.infra.transfer_manifest import TransferManifest
+from src.extraction_tools.util.metrics import METRICS
+from src.extraction_tools.util.ttl_cache import TTLCache
+
 class SSHClient:
-    def __init__(self, host: str, username: str, password: str):
+    def __init__(self, host: str, username: str, password: str, max_channels: int = 8, max_transports: int = 1,
+                 listing_cache_size: int = 4096, listing_cache_ttl: float = 60.0,
+                 manifest: TransferManifest | None = None, port: int = 22):
+        """
+        max_channels: 동시에 사용할 SFTP 채널 수 (동시 전송 수 제한)
+        max_transports: 채널을 나눠 담을 SSH 연결 수
+        listing_cache_size, listing_cache_ttl: stat_many (exists_many) 가 find 없이 사용하는 원격 폴더 목록 캐시 크기, 보관 시간 (초)
+        manifest: 전송 기록, 있으면 크기와 수정 시간이 그대로인 파일은 다시 받지 않는다
+        port: SSH 포트
+        """
+        self._host = host
+        self._port = port
+        self._username = username
+        self._password = password
         self._client = paramiko.SSHClient()
         self._client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
 
-        self._connect(host, username, password)
+        self._connect(self._client, host, username, password)
         try:
             self._sftp = self._client.open_sftp()
         except Exception as e:
             print(f"Failed to open sftp")
             print(f"reason {e}")
 
-    def _connect(self, host_ip: str, host_name: str, password: str):
+        self._max_channels = max(1, max_channels)
+        self._max_transports = max(1, min(max_transports, self._max_channels))
+        self._transports: list[paramiko.SSHClient] = [self._client]
+        self._channel_pool: queue.Queue[paramiko.SFTPClient] = queue.Queue()
+        self._opened_channels = 0
+        self._pool_lock = threading.Lock()
+        # 채널을 배정한 횟수 (연결 선택용), 연결 추가와 함께 _transport_lock 안에서만 바꾼다
+        self._assigned_channels = 0
+        self._transport_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=self._max_channels, thread_name_prefix="sftp")
+        self._listing_cache = TTLCache(max_size=listing_cache_size, ttl=listing_cache_ttl)
+        self._remote_commands: dict[str, bool] = {}
+        self._manifest = manifest
+
+    @property
+    def max_channels(self) -> int:
+        return self._max_channels
+
+    def _connect(self, client: paramiko.SSHClient, host_ip: str, host_name: str, password: str):
         try:
-            self._client.connect(hostname=host_ip, username=host_name, password=password)
+            client.connect(hostname=host_ip, port=self._port, username=host_name, password=password)
             print(f"Connected to {host_ip} as {host_name}")
         except Exception as e:
             print(f"Failed to connect to {host_ip} as {host_name}")
             print(f"reason {e}")
 
-    async def download(self, remote_path: str, local_path: str):
+    def _open_channel(self) -> paramiko.SFTPClient:
+        # 채널을 SSH 연결에 번갈아 배정하고, 부족한 연결은 새로 맺는다
+        # 여러 스레드가 동시에 채널을 열 수 있으므로 연결 선택과 추가는 lock 안에서 진행한다
+        with self._transport_lock:
+            transport_index = self._assigned_channels % self._max_transports
+            self._assigned_channels += 1
+            if transport_index < len(self._transports):
+                client = self._transports[transport_index]
+            else:
+                client = paramiko.SSHClient()
+                client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+                self._connect(client, self._host, self._username, self._password)
+                if client.get_transport() is None or not client.get_transport().is_active():
+                    client.close()
+                    raise ConnectionError(f"Failed to connect to {self._host}")
+                self._transports.append(client)
+        return client.open_sftp()
+
+    @contextmanager
+    def _channel(self):
+        """
+        채널 풀에서 SFTP 채널을 빌려준다
+            남는 채널이 없고 최대치에 도달하지 않았다면 새로 연다
+            오류가 발생한 채널은 닫고 풀에 반납하지 않는다
+        """
         try:
-            self._sftp.get(remote_path, local_path)
+            sftp = self._channel_pool.get_nowait()
+        except queue.Empty:
+            with self._pool_lock:
+                can_open = self._opened_channels < self._max_channels
+                if can_open:
+                    self._opened_channels += 1
+            if can_open:
+                try:
+                    sftp = self._open_channel()
+                except Exception:
+                    with self._pool_lock:
+                        self._opened_channels -= 1
+                    raise
+            else:
+                sftp = self._channel_pool.get()
+        try:
+            yield sftp
+        finally:
+            if sftp.get_channel().closed:
+                sftp.close()
+                with self._pool_lock:
+                    self._opened_channels -= 1
+            else:
+                self._channel_pool.put(sftp)
+
+    async def _run(self, func, *args):
+        # 블로킹 paramiko 호출을 작업 스레드에서 실행 (동시 실행 수 = max_channels)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._timed, func, *args)
+
+    @staticmethod
+    def _timed(func, *args):
+        # 작업 스레드에서 실제로 실행된 시간만 기록한다 (대기 시간 제외)
+        with METRICS.timer("sftp_operation_seconds", op=func.__name__.lstrip("_")):
+            return func(*args)
+
+    @staticmethod
+    def _count_transfer(op: str, size: int):
+        METRICS.inc("sftp_files_total", op=op)
+        METRICS.inc("sftp_bytes_total", size, op=op)
+
+    async def download(self, remote_path: str, local_path: str, size: int = None, mtime: float = None):
+        """
+        size, mtime: 이미 알고 있는 원격 파일 정보 (manifest 비교에 사용, 없으면 stat 으로 조회)
+        """
+        return await self._run(self._download, remote_path, local_path, size, mtime)
+
+    def _download(self, remote_path: str, local_path: str, size: int = None, mtime: float = None):
+        try:
+            with self._channel() as sftp:
+                if self._manifest is None:
+                    self._get(sftp, remote_path, local_path, size)
+                    self._count_transfer("download", os.path.getsize(local_path))
+                    return True
+                if size is None or mtime is None:
+                    attr = sftp.stat(remote_path)
+                    size, mtime = attr.st_size, attr.st_mtime
+                if self._manifest.is_transferred(remote_path, local_path, size, mtime):
+                    return True
+                # 중단되어도 받다 만 파일이 완료로 남지 않도록 임시 파일에 받은 뒤 이름을 바꾼다
+                self._get(sftp, remote_path, f"{local_path}.part", size)
+            os.replace(f"{local_path}.part", local_path)
+            self._manifest.record(remote_path, local_path, size, mtime)
+            self._count_transfer("download", size)
             return True
         except Exception as e:
+            METRICS.inc("sftp_errors_total", op="download")
             return False
 
+    @staticmethod
+    def _get(sftp: paramiko.SFTPClient, remote_path: str, local_path: str, size: int = None):
+        # sftp.get 은 prefetch 크기를 알기 위해 stat 을 한번 더 하므로, 크기를 알고 있다면 직접 받는다
+        if size is None:
+            sftp.get(remote_path, local_path)
+            return
+        with sftp.open(remote_path, "rb") as remote_file, open(local_path, "wb") as local_file:
+            remote_file.prefetch(size)
+            shutil.copyfileobj(remote_file, local_file, 32768)
+        if os.path.getsize(local_path) != size:
+            raise IOError(f"size mismatch in get! {os.path.getsize(local_path)} != {size}")
+
     async def folder_download(self, remote_path: str, local_path: str, img_id: str = ""):
         """
         원격지에 다운로드 오브젝트를 확인한다
@@ -38,34 +183,242 @@ class SSHClient:
             폴더라면 재귀적으로 재탐색 한다
                 폴더가 아니라면 다운로드를 진행한다
                 이때 로컬에 폴더가 없다면 생성한다
+        하위 폴더와 파일의 다운로드는 동시에 진행한다
         """
         try:
             remote_path = f"{remote_path}{img_id}"
             local_path = f"{local_path}{img_id}"
-            files = self._sftp.listdir_attr(remote_path)
+            files = await self._run(self._listdir_attr, remote_path)
+            coroutines = []
             for file in files:
                 if S_ISDIR(file.st_mode):
-                    await self.folder_download(f"{remote_path}/{file.filename}", f"{local_path}/{file.filename}")
+                    coroutines.append(
+                        self.folder_download(f"{remote_path}/{file.filename}", f"{local_path}/{file.filename}")
+                    )
                 else:
                     if not os.path.exists(local_path):
                         os.makedirs(local_path, exist_ok=True)
-                    if not self.is_exist(f"{remote_path}/{file.filename}"):
-                        continue
-                    await self.download(f"{remote_path}/{file.filename}", f"{local_path}/{file.filename}")
+                    coroutines.append(
+                        self.download(f"{remote_path}/{file.filename}", f"{local_path}/{file.filename}",
+                                      file.st_size, file.st_mtime)
+                    )
+            await asyncio.gather(*coroutines)
         except Exception as e:
             print(f"Failed to download {remote_path}")
             print(f"reason {e}")
             return
 
+    async def folder_download_many(self, remote_path: str, local_path: str, img_ids: list[str],
+                                   batch_size: int = 200):
+        """
+        여러 img_id 폴더를 find 목록 조회로 한번에 다운로드한다
+            img_id 를 batch_size 개씩 묶어 find 를 1회 실행하고, 결과 목록으로 다운로드를 진행한다
+            원격지에 find 가 없다면 folder_download 로 폴더를 하나씩 탐색한다
+        """
+        coroutines = []
+        for i in range(0, len(img_ids), batch_size):
+            batch = img_ids[i:i + batch_size]
+            try:
+                manifest = await self._run(self.list_remote_tree, [f"{remote_path}{img_id}" for img_id in batch])
+            except FileNotFoundError:
+                coroutines.extend(self.folder_download(remote_path, local_path, img_id) for img_id in batch)
+                continue
+            coroutines.append(self.download_manifest(manifest, remote_path, local_path))
+        await asyncio.gather(*coroutines)
+
+    async def download_manifest(self, manifest: list[RemoteFileVo], remote_path: str, local_path: str):
+        # 목록의 원격 경로에서 remote_path 를 local_path 로 바꾸어 다운로드
+        coroutines = [
+            self.download(file.path, target, file.size, file.mtime)
+            for file, target in self._manifest_targets(manifest, remote_path, local_path)
+        ]
+        return await asyncio.gather(*coroutines)
+
+    async def list_download_targets(self, remote_path: str, local_path: str,
+                                    img_ids: list[str]) -> list[tuple[RemoteFileVo, str]]:
+        """
+        folder_download_many 의 목록 조회 단계만 진행한다 (다운로드는 호출한 쪽에서 진행)
+            원격지에 find 가 없다면 folder_download 로 바로 다운로드하고 빈 목록을 반환한다
+        @return: [(원격 파일, 로컬 경로)]
+        """
+        try:
+            manifest = await self._run(self.list_remote_tree, [f"{remote_path}{img_id}" for img_id in img_ids])
+        except FileNotFoundError:
+            await asyncio.gather(*(self.folder_download(remote_path, local_path, img_id) for img_id in img_ids))
+            return []
+        return self._manifest_targets(manifest, remote_path, local_path)
+
+    @staticmethod
+    def _manifest_targets(manifest: list[RemoteFileVo], remote_path: str,
+                          local_path: str) -> list[tuple[RemoteFileVo, str]]:
+        # 폴더는 로컬에 만들고, 파일은 (원격 파일, 로컬 경로) 로 반환
+        targets = []
+        for file in manifest:
+            target = f"{local_path}{file.path[len(remote_path):]}"
+            if file.is_dir:
+                os.makedirs(target, exist_ok=True)
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            targets.append((file, target))
+        return targets
 
+    def list_remote_tree(self, roots: list[str], max_depth: int = None) -> list[RemoteFileVo]:
+        """
+        find -printf 1회로 원격 폴더 하위의 모든 항목을 조회한다 (경로, 크기, 수정 시간, 종류)
+        존재하지 않는 root 는 결과에서 빠진다
+        max_depth: 0 이면 root 자신만 조회한다 (여러 파일의 stat 을 한번에 조회)
+        원격지에 find 명령이 없거나 -printf 를 지원하지 않는다면 (BusyBox 등) FileNotFoundError
+        """
+        if not self._has_find_printf():
+            raise FileNotFoundError("find -printf is not supported on remote host")
+        depth = f" -maxdepth {max_depth}" if max_depth is not None else ""
+        command = (f"find {' '.join(shlex.quote(root) for root in roots)}{depth}"
+                   f" -printf '%y\\t%s\\t%T@\\t%p\\0'")
+        _, stdout, _ = self._client.exec_command(command)
+        manifest = []
+        buffer = b""
+        for chunk in iter(lambda: stdout.read(65536), b""):
+            buffer += chunk
+            *records, buffer = buffer.split(b"\0")
+            manifest.extend(self._parse_find_record(record) for record in records if record)
+        if stdout.channel.recv_exit_status() == 127:
+            raise FileNotFoundError("find command not found on remote host")
+        return manifest
+
+    @staticmethod
+    def _parse_find_record(record: bytes) -> RemoteFileVo:
+        file_type, size, mtime, path = record.decode("utf-8", errors="surrogateescape").split("\t", 3)
+        return RemoteFileVo(path=path, size=int(size), mtime=float(mtime), is_dir=file_type == "d")
+
+    async def bulk_download(self, targets: dict[str, str], batch_size: int = 500) -> set[str]:
+        """
+        여러 파일을 tar 스트림으로 한번에 다운로드한다
+            원격지에서 tar -cf - 를 실행하고, 받은 스트림을 바로 풀면서 targets 의 로컬 경로로 저장한다
+            batch_size 개의 파일마다 tar 를 1회 실행한다 (동시 실행)
+            원격지에 tar 가 없다면 파일별 SFTP 다운로드
+        @param targets: { remote_path: local_path }
+        @return: 다운로드된 remote_path 집합 (manifest 로 건너뛴 파일 포함, 원격지에 없는 파일은 빠진다)
+        """
+        remote_paths = list(targets)
+        transferred = set()
+        if self._manifest is not None and await self._run(self._has_find_printf):
+            remote_paths, transferred = await self._run(self._filter_transferred, remote_paths, targets, batch_size)
+        if not await self._run(self._has_remote_command, "tar"):
+            existing = await self.stat_many(remote_paths)
+            remote_paths = [path for path in remote_paths if path in existing]
+            results = await asyncio.gather(*(
+                self.download(path, targets[path], existing[path].size, existing[path].mtime) for path in remote_paths
+            ))
+            return transferred | {path for path, result in zip(remote_paths, results) if result}
+
+        batches = [
+            {path: targets[path] for path in remote_paths[i:i + batch_size]}
+            for i in range(0, len(remote_paths), batch_size)
+        ]
+        results = await asyncio.gather(*(self._run(self._tar_download, batch) for batch in batches))
+        # tar 스트림이 중간에 끊긴 batch 의 나머지 파일은 파일별 SFTP 다운로드로 다시 받는다
+        retry = [path for _, pending in results for path in pending]
+        retried = await asyncio.gather(*(self.download(path, targets[path]) for path in retry))
+        return transferred.union(*(downloaded for downloaded, _ in results),
+                                 (path for path, result in zip(retry, retried) if result))
+
+    def _filter_transferred(self, remote_paths: list[str], targets: dict[str, str],
+                            batch_size: int) -> tuple[list[str], set[str]]:
+        # find -maxdepth 0 으로 원격 파일 정보를 한번에 조회하고, manifest 와 같은 파일을 제외한다
+        # 원격지에 없는 파일도 함께 제외된다
+        # @return: (전송할 경로, 이미 전송된 경로)
+        pending, transferred = [], set()
+        for i in range(0, len(remote_paths), batch_size):
+            for file in self.list_remote_tree(remote_paths[i:i + batch_size], max_depth=0):
+                if file.is_dir or file.path not in targets:
+                    continue
+                if self._manifest.is_transferred(file.path, targets[file.path], file.size, file.mtime):
+                    transferred.add(file.path)
+                else:
+                    pending.append(file.path)
+        return pending, transferred
+
+    def _tar_download(self, targets: dict[str, str]) -> tuple[set[str], list[str]]:
+        """
+        @return: (다운로드된 remote_path 집합, 스트림이 끊겨 받지 못한 remote_path 목록)
+        """
+        # tar 는 절대 경로의 앞 "/" 를 지우고 저장한다
+        members = {path.lstrip("/"): path for path in targets}
+        command = f"tar -cf - -- {' '.join(shlex.quote(path) for path in targets)}"
+        downloaded = set()
+        local_path = None
+        try:
+            _, stdout, _ = self._client.exec_command(command)
+            with tarfile.open(fileobj=stdout, mode="r|") as tar:
+                for member in tar:
+                    remote_path = members.get(member.name)
+                    if not member.isfile() or remote_path is None:
+                        continue
+                    local_path = targets[remote_path]
+                    with tar.extractfile(member) as src, open(f"{local_path}.part", "wb") as dst:
+                        shutil.copyfileobj(src, dst)
+                    os.replace(f"{local_path}.part", local_path)
+                    if self._manifest is not None:
+                        self._manifest.record(remote_path, local_path, member.size, member.mtime)
+                    self._count_transfer("tar_download", member.size)
+                    downloaded.add(remote_path)
+        except Exception as e:
+            METRICS.inc("sftp_errors_total", op="tar_download")
+            print(f"Failed to download tar stream")
+            print(f"reason {e}")
+            # 받다 만 파일은 지우고, 아직 받지 못한 파일을 반환한다 (원격지에 없는 파일도 포함될 수 있다)
+            if local_path is not None and os.path.exists(f"{local_path}.part"):
+                os.remove(f"{local_path}.part")
+            return downloaded, [path for path in targets if path not in downloaded]
+        return downloaded, []
+
+    def _has_remote_command(self, command: str) -> bool:
+        if command not in self._remote_commands:
+            try:
+                _, stdout, _ = self._client.exec_command(f"command -v {shlex.quote(command)}")
+                self._remote_commands[command] = stdout.channel.recv_exit_status() == 0
+            except Exception:
+                self._remote_commands[command] = False
+        return self._remote_commands[command]
+
+    def _has_find_printf(self) -> bool:
+        # -printf 가 없는 find 는 아무것도 출력하지 않고 1 로 끝나므로, 실제로 출력되는지 1회 확인한다
+        if "find -printf" not in self._remote_commands:
+            try:
+                _, stdout, _ = self._client.exec_command("find . -maxdepth 0 -printf ok")
+                supported = stdout.read() == b"ok" and stdout.channel.recv_exit_status() == 0
+            except Exception:
+                supported = False
+            self._remote_commands["find -printf"] = supported
+        return self._remote_commands["find -printf"]
+
+    def _listdir_attr(self, remote_path: str) -> list[paramiko.SFTPAttributes]:
+        with self._channel() as sftp:
+            return sftp.listdir_attr(remote_path)
 
     async def upload(self, local_path: str, remote_path: str):
+        return await self._run(self._upload, local_path, remote_path)
+
+    def _upload(self, local_path: str, remote_path: str):
         try:
-            self._sftp.put(local_path, remote_path)
+            with self._channel() as sftp:
+                sftp.put(local_path, remote_path)
+            self._count_transfer("upload", os.path.getsize(local_path))
             return True
         except Exception as e:
+            METRICS.inc("sftp_errors_total", op="upload")
             return False
 
+    def close(self):
+        self._executor.shutdown(wait=True)
+        while not self._channel_pool.empty():
+            self._channel_pool.get_nowait().close()
+        with self._transport_lock:
+            for client in self._transports:
+                client.close()
+        if self._manifest is not None:
+            self._manifest.close()
+
     def check_files_existence(self, merge_rotate_group):
         # 파일 존재 여부 확인
         remote_path = f"input"
@@ -89,3 +442,54 @@ class SSHClient:
             return False
         except Exception as e:
             return False
+
+    async def exists_many(self, paths: Iterable[str], batch_size: int = 500) -> set[str]:
+        """
+        여러 원격 경로의 존재 여부를 한번에 확인한다 (stat_many 참고)
+        @return: 존재하는 경로 집합
+        """
+        return set(await self.stat_many(paths, batch_size))
+
+    async def stat_many(self, paths: Iterable[str], batch_size: int = 500) -> dict[str, RemoteFileVo]:
+        """
+        여러 원격 경로의 정보 (크기, 수정 시간) 를 한번에 조회한다
+            find -maxdepth 0 으로 batch_size 개의 경로마다 1회 조회한다
+            원격지에서 find -printf 를 사용할 수 없다면 상위 폴더별로 묶어 폴더마다 목록을 1회 조회한다 (폴더 목록은 캐시)
+        조회한 크기와 수정 시간을 download 에 넘기면 manifest 비교에 stat 을 다시 하지 않는다
+        @return: { 존재하는 경로: 원격 파일 정보 }
+        """
+        paths = list(paths)
+        if await self._run(self._has_find_printf):
+            listings = await asyncio.gather(*(
+                self._run(self.list_remote_tree, paths[i:i + batch_size], 0)
+                for i in range(0, len(paths), batch_size)
+            ))
+            return {file.path: file for listing in listings for file in listing}
+
+        by_parent: dict[str, list[tuple[str, str]]] = {}
+        for path in paths:
+            parent, name = posixpath.split(path)
+            by_parent.setdefault(parent, []).append((name, path))
+        listings = await asyncio.gather(*(self._run(self._list_files, parent) for parent in by_parent))
+        return {
+            path: files[name].model_copy(update={"path": path})
+            for targets, files in zip(by_parent.values(), listings)
+            for name, path in targets
+            if name in files
+        }
+
+    def _list_files(self, directory: str) -> dict[str, RemoteFileVo]:
+        # { 이름: 원격 파일 정보 } (path 는 이름만, 호출한 쪽에서 바꾼다)
+        files = self._listing_cache.get(directory)
+        if files is None:
+            try:
+                with self._channel() as sftp:
+                    files = {
+                        attr.filename: RemoteFileVo(path=attr.filename, size=attr.st_size or 0,
+                                                    mtime=attr.st_mtime or 0, is_dir=S_ISDIR(attr.st_mode or 0))
+                        for attr in sftp.listdir_attr(directory or ".")
+                    }
+            except IOError:
+                files = {}
+            self._listing_cache.set(directory, files)
+        return files
@@ -0,0 +1,23 @@
+from datetime import datetime
+from typing import NamedTuple
+
+
+# Vo 의 검증 없는 가벼운 버전 (대량 조회용), 필드 순서는 조회 컬럼 순서와 같다
+class IssueTagRecord(NamedTuple):
+    issue_code: str
+    rotate: int
+    tag_code: str
+    created_at: datetime
+
+
+class IssueCodeNTimeRecord(NamedTuple):
+    issue_code: str
+    created_at: datetime
+
+
+class IssueLinkTagCodeRecord(NamedTuple):
+    issue_code: str
+    issue_created_at: datetime
+    rotate: int
+    package_link: str | None
+    tag_code: str
@@ -16,11 +16,18 @@ class DatabaseInformation(BaseModel):
     password: str
     db_name: str
     port: int
+    # connection pool 설정 (ORM 참고)
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: float = 30
+    pool_recycle: int = 3600
+    pool_pre_ping: bool = True
 
 class IssueTagResult(BaseModel):
     issue_code: str
     rotate: int
     tag_code: str
+    created_at: datetime | None = None
 
 class IssueCodeNTime(BaseModel):
     issue_code: str
@@ -33,6 +40,12 @@ class IssueLinkTagCode(BaseModel):
     package_link: str | None
     tag_code: str
 
+class RemoteFileVo(BaseModel):
+    path: str
+    size: int
+    mtime: float
+    is_dir: bool
+
 class LanguageVo(BaseModel):
     name: str | None
 
@@ -0,0 +1,190 @@
+from collections.abc import AsyncIterator
+from datetime import datetime, timedelta, date
+from typing import Sequence
+
+from sqlalchemy import Row
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.extraction_tools.dto.Record import IssueTagRecord, IssueCodeNTimeRecord, IssueLinkTagCodeRecord
+from src.extraction_tools.dto.Vo import IssueTagResult, IssueCodeNTime, IssueLinkTagCode
+from src.extraction_tools.infra.orm import ORM
+from src.extraction_tools.infra.schema import Question
+from src.extraction_tools.util.metrics import instrument_engine
+
+
+class AsyncORM:
+    def __init__(self, host: str, db_user: str, db_password: str, port: int, db_name: str, url: str = None,
+                 pool_size: int = 5, max_overflow: int = 10, pool_timeout: float = 30,
+                 pool_recycle: int = 3600, pool_pre_ping: bool = True):
+        """
+        ORM 의 비동기 버전 (조회 중에도 이벤트 루프가 막히지 않는다)
+        url: 직접 지정할 접속 주소 (예: 테스트용 "sqlite+aiosqlite:///test.db"), 없으면 aiomysql 로 접속
+        pool_*: ORM 과 같은 connection pool 설정 (메모리 SQLite 는 pool_recycle, pool_pre_ping 만 적용)
+        쿼리는 ORM 의 query builder (_*_query) 를 같이 사용한다
+        """
+        url = url or f"mysql+aiomysql://{db_user}:{db_password}@{host}:{port}/{db_name}"
+        self._engine = create_async_engine(
+            url=url,
+            **ORM._pool_options(url, pool_size, max_overflow, pool_timeout, pool_recycle, pool_pre_ping),
+            # echo=True,
+        )
+        instrument_engine(self._engine.sync_engine)
+
+    async def dispose(self):
+        await self._engine.dispose()
+
+    async def _fetch_all(self, q) -> Sequence:
+        async with AsyncSession(self._engine) as session:
+            result = await session.exec(q)
+            return result.fetchall()
+
+    async def _stream(self, q, partition_size: int) -> AsyncIterator[Sequence[Row]]:
+        # 서버 사이드 커서로 조회하면서 partition_size 개씩 반환한다 (ORM._stream 참고)
+        async with AsyncSession(self._engine) as session:
+            result = await session.stream(q.execution_options(yield_per=partition_size))
+            async for partition in result.partitions():
+                yield partition
+
+    async def _iter_windows(self, query_func: callable, start: datetime, end: datetime,
+                            partition_size: int) -> AsyncIterator[Sequence[Row]]:
+        # ORM._iter_windows 의 비동기 버전 (구간마다 결과를 모두 읽은 뒤 partition_size 개씩)
+        for window_start, window_end in ORM._windows(start, end):
+            rows = await self._fetch_all(query_func(window_start, window_end))
+            for i in range(0, len(rows), partition_size):
+                yield rows[i:i + partition_size]
+
+    async def get_image_group_by_date(self, target_date: dict[str, list[date]], data_fetch_func: callable,
+                                      compact: bool = False) -> dict[date, list]:
+        """
+        ORM.get_image_group_by_date(bulk=True) 의 비동기 버전
+        @param data_fetch_func: (start, end) 구간의 이슈를 반환하는 AsyncORM 조회 함수
+        """
+        img_group = {day: [] for key in target_date for day in target_date[key]}
+        for key in target_date:
+            if not target_date[key]:
+                continue
+            days = set(target_date[key])
+            start, end = min(days), max(days) + timedelta(days=1)
+            for issue in await data_fetch_func(start, end, compact=compact):
+                day = ORM._get_created_date(issue)
+                if day in days:
+                    img_group[day].append(issue)
+        return img_group
+
+    async def iter_image_by_date(self, target_date: dict[str, list[date]], data_iter_func: callable,
+                                 partition_size: int = 1000, compact: bool = False) -> AsyncIterator[list]:
+        """
+        ORM.iter_image_by_date 의 비동기 버전
+            Pipeline 의 source 로 넘기면 조회 결과가 이벤트 루프에서 바로 전송 큐로 들어간다 (작업 스레드 없이)
+        @param data_iter_func: (start, end, partition_size) 구간의 이슈를 나눠 반환하는 AsyncORM iter_* 조회 함수
+        """
+        for key in target_date:
+            if not target_date[key]:
+                continue
+            days = set(target_date[key])
+            start, end = min(days), max(days) + timedelta(days=1)
+            async for partition in data_iter_func(start, end, partition_size, compact=compact):
+                issues = [issue for issue in partition if ORM._get_created_date(issue) in days]
+                if issues:
+                    yield issues
+
+    async def get_package_data_by_created_at_range(self, day: datetime, end: datetime = None,
+                                                   compact: bool = False) -> list[IssueCodeNTime] | list[IssueCodeNTimeRecord]:
+        issue = await self._fetch_all(ORM._package_data_query(day, end or day + timedelta(minutes=1440)))
+        if compact:
+            return list(map(IssueCodeNTimeRecord._make, issue))
+        return [ORM._to_issue_code_n_time(row) for row in issue]
+
+    async def get_sample_data_by_created_at_range(self, day: datetime, end: datetime = None,
+                                                  compact: bool = False) -> list[IssueTagResult] | list[IssueTagRecord]:
+        issue = await self._fetch_all(ORM._sample_data_query(day, end or day + timedelta(minutes=1440)))
+        if compact:
+            return list(map(IssueTagRecord._make, issue))
+        return [ORM._to_issue_tag_result(row) for row in issue]
+
+    async def get_all_sample_date_by_issue_tag_match(self, day: datetime, end: datetime = None,
+                                                     compact: bool = False) -> list[IssueLinkTagCode] | list[IssueLinkTagCodeRecord]:
+        issue = await self._fetch_all(ORM._sample_issue_tag_match_query(day, end or day + timedelta(minutes=1440)))
+        if compact:
+            return list(map(IssueLinkTagCodeRecord._make, issue))
+        return [ORM._to_issue_link_tag_code(row) for row in issue]
+
+    async def iter_package_data_by_created_at_range(self, start: datetime, end: datetime, partition_size: int = 1000,
+                                                    compact: bool = False) -> AsyncIterator[list]:
+        async for partition in self._iter_windows(ORM._package_data_query, start, end, partition_size):
+            if compact:
+                yield list(map(IssueCodeNTimeRecord._make, partition))
+                continue
+            yield [ORM._to_issue_code_n_time(row) for row in partition]
+
+    async def iter_sample_data_by_created_at_range(self, start: datetime, end: datetime, partition_size: int = 1000,
+                                                   compact: bool = False) -> AsyncIterator[list]:
+        async for partition in self._iter_windows(ORM._sample_data_query, start, end, partition_size):
+            if compact:
+                yield list(map(IssueTagRecord._make, partition))
+                continue
+            yield [ORM._to_issue_tag_result(row) for row in partition]
+
+    async def iter_all_sample_date_by_issue_tag_match(self, start: datetime, end: datetime, partition_size: int = 1000,
+                                                      compact: bool = False) -> AsyncIterator[list]:
+        async for partition in self._iter_windows(ORM._sample_issue_tag_match_query, start, end, partition_size):
+            if compact:
+                yield list(map(IssueLinkTagCodeRecord._make, partition))
+                continue
+            yield [ORM._to_issue_link_tag_code(row) for row in partition]
+
+    async def get_all_sample_data_by_package_link_in(self, package_links: set[str],
+                                                     chunk_size: int = 1000) -> dict[str, dict[int, Row]]:
+        links = list(package_links)
+        rotations = {}
+        async with AsyncSession(self._engine) as session:
+            for i in range(0, len(links), chunk_size):
+                for row in (await session.exec(ORM._package_link_in_query(links[i:i + chunk_size]))).fetchall():
+                    rotations.setdefault(row.package_link, {})[row.rotate] = row
+        return rotations
+
+    async def get_barcode_by_issue_code(self, issue_code: str):
+        async with AsyncSession(self._engine) as session:
+            return (await session.exec(ORM._barcode_by_issue_code_query(issue_code))).one_or_none()
+
+    async def get_tag_index(self, tag_codes: set[str] | None = None, chunk_size: int = 1000) -> dict[str, Row]:
+        if tag_codes is None:
+            return ORM._to_tag_index(await self._fetch_all(ORM._tag_index_query()))
+        codes = list(tag_codes)
+        rows = []
+        async with AsyncSession(self._engine) as session:
+            for i in range(0, len(codes), chunk_size):
+                rows.extend((await session.exec(ORM._tag_index_query(codes[i:i + chunk_size]))).fetchall())
+        return ORM._to_tag_index(rows)
+
+    async def get_issue_by_tag_type(self, tag_type: str):
+        return await self._fetch_all(ORM._issue_by_tag_type_query(tag_type))
+
+    async def iter_issue_by_tag_type(self, tag_type: str, partition_size: int = 1000) -> AsyncIterator[Sequence[Row]]:
+        async for partition in self._stream(ORM._issue_by_tag_type_query(tag_type), partition_size):
+            yield partition
+
+    async def get_all_question_seq(self):
+        return await self._fetch_all(select(Question.seq))
+
+    async def get_all_question_and_option_img_id(self) -> Sequence[Row]:
+        return await self._fetch_all(ORM._question_and_option_img_id_query())
+
+    async def iter_all_question_and_option_img_id(self, partition_size: int = 1000) -> AsyncIterator[Sequence[Row]]:
+        # ORM.iter_all_question_and_option_img_id 의 비동기 버전 (문제 seq 를 partition_size 개씩 keyset 으로 나누어 조회)
+        last_seq = 0
+        while True:
+            seqs = await self._fetch_all(
+                select(Question.seq).where(Question.seq > last_seq).order_by(Question.seq).limit(partition_size)
+            )
+            if not seqs:
+                return
+            q = ORM._question_and_option_img_id_query(seqs[0], seqs[-1])
+            rows = await self._fetch_all(q.order_by(q.selected_columns.question_seq))
+            if rows:
+                yield rows
+            if len(seqs) < partition_size:
+                return
+            last_seq = seqs[-1]
@@ -1,101 +1,409 @@
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
 from datetime import datetime, timedelta, date
-from typing import Sequence
+from typing import Sequence, Iterator, Iterable
 
-from sqlalchemy import between, func, exists
-from sqlmodel import create_engine, Session, select, desc
+from sqlalchemy import between, func, exists, Row, literal, union_all, insert, text, DateTime
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import selectinload
+from sqlalchemy.pool import QueuePool
+from sqlmodel import create_engine, Session, select, desc, SQLModel
 
+from src.extraction_tools.dto.Record import IssueTagRecord, IssueCodeNTimeRecord, IssueLinkTagCodeRecord
 from src.extraction_tools.dto.Vo import IssueTagResult, IssueCodeNTime, IssueLinkTagCode
 from src.extraction_tools.infra.schema import Issue, IssueTagMatch, TagLite, TagFull, CategoryEnum, \
-    Question, Option, QuestionData, OptionData, Difficulty
+    Question, Option, QuestionData, OptionData, Difficulty, Language, DifficultyEnum
+from src.extraction_tools.infra.query_cache import QueryCache
+from src.extraction_tools.util.metrics import instrument_engine
 
 
 class ORM:
-    def __init__(self, host:str, db_user: str, db_password: str, port: int, db_name: str):
+    # enable_query_cache 로 캐시할 읽기 전용 메서드별 보관 시간 (초)
+    # 결과가 작고 같은 인자로 반복 호출되는 메서드만 (get_issue_by_tag_type 처럼 결과가 큰 조회, get_tag_index 처럼
+    # 인자 (코드 목록) 가 매번 다른 조회, 세션에 연결된 객체를 반환하는 조회는 제외)
+    QUERY_CACHE_TTL: dict[str, float] = {
+        "get_tag_by_tag_code": 600,
+        "get_barcode_by_issue_code": 600,
+        "get_all_question_seq": 300,
+        "get_all_issue_count": 60,
+    }
+
+    def __init__(self, host:str, db_user: str, db_password: str, port: int, db_name: str, url: str = None,
+                 pool_size: int = 5, max_overflow: int = 10, pool_timeout: float = 30,
+                 pool_recycle: int = 3600, pool_pre_ping: bool = True):
+        """
+        url: 직접 지정할 접속 주소 (예: 벤치마크용 "sqlite:///bench.db"), 없으면 pymysql 로 접속
+        pool_size, max_overflow: 유지할 connection 수, 추가로 열 수 있는 connection 수
+        pool_timeout: connection 을 기다릴 최대 시간 (초)
+        pool_recycle: 이 시간 (초) 보다 오래된 connection 은 다시 연결한다 (MySQL wait_timeout 보다 짧게)
+        pool_pre_ping: connection 을 꺼낼 때 살아있는지 확인한다 ("MySQL server has gone away" 방지)
+        pool_size, max_overflow, pool_timeout 은 QueuePool 을 사용하는 접속 주소에만 적용된다 (메모리 SQLite 제외)
+        """
+        url = url or f"mysql+pymysql://{db_user}:{db_password}@{host}:{port}/{db_name}"
         self._engine = create_engine(
-            url=f"mysql+pymysql://{db_user}:{db_password}@{host}:{port}/{db_name}",
+            url=url,
+            **self._pool_options(url, pool_size, max_overflow, pool_timeout, pool_recycle, pool_pre_ping),
             # echo=True,
         )
+        instrument_engine(self._engine)
+        # unit_of_work 안에서 같이 사용할 session (asyncio task, 스레드마다 따로)
+        self._uow_session: ContextVar[Session | None] = ContextVar(f"orm_uow_{id(self)}", default=None)
+        # 작은 참조 테이블 캐시 { model: [row] }
+        self._reference_cache: dict[type[SQLModel], list[SQLModel]] = {}
+        self._query_cache: QueryCache | None = None
+        # 여러 행 INSERT 의 auto increment 값이 연속인지 여부 (MySQL, 처음 bulk_insert 할 때 확인)
+        self._consecutive_auto_increment: bool | None = None
 
-    def save(self, obj: list[object] | object):
+    @staticmethod
+    def _pool_options(url: str, pool_size: int, max_overflow: int, pool_timeout: float, pool_recycle: int,
+                      pool_pre_ping: bool) -> dict:
+        # SingletonThreadPool, StaticPool (메모리 SQLite) 은 pool_size, max_overflow, pool_timeout 을 받지 않는다
+        options = {"pool_recycle": pool_recycle, "pool_pre_ping": pool_pre_ping}
+        url = make_url(url)
+        if issubclass(url.get_dialect().get_pool_class(url), QueuePool):
+            options.update(pool_size=pool_size, max_overflow=max_overflow, pool_timeout=pool_timeout)
+        return options
+
+    @contextmanager
+    def unit_of_work(self, commit: bool = True) -> Iterator[Session]:
+        """
+        with orm.unit_of_work() as uow: 블록 안의 ORM 호출이 session (connection) 하나를 같이 사용한다
+            블록이 끝나면 commit (commit=False 면 하지 않는다), 예외가 나면 rollback 후 닫는다
+            중첩되면 바깥 session 을 그대로 사용한다 (commit 은 바깥 블록에서)
+            commit 후에도 객체를 계속 읽을 수 있도록 expire_on_commit=False
+            commit 하면 query cache 를 비운다
+        @return: 공유 session (session 을 받는 메서드에 넘길 수 있다)
+        """
+        session = self._uow_session.get()
+        if session is not None:
+            yield session
+            return
+        with Session(self._engine, expire_on_commit=False) as session:
+            token = self._uow_session.set(session)
+            try:
+                yield session
+                if commit:
+                    session.commit()
+                    self.invalidate_query_cache()
+            except Exception:
+                session.rollback()
+                raise
+            finally:
+                self._uow_session.reset(token)
+
+    @contextmanager
+    def _session(self) -> Iterator[Session]:
+        # unit_of_work 안이면 공유 session, 아니면 호출마다 새 session
+        session = self._uow_session.get()
+        if session is not None:
+            yield session
+            return
         with Session(self._engine) as session:
+            yield session
+
+    def save(self, obj: list[object] | object):
+        with self._session() as session:
             if isinstance(obj, list):
                 session.add_all(obj)
             else:
                 session.add(obj)
             session.commit()
+        self.invalidate_query_cache()
 
-    def get_image_group_by_date(self, target_date: dict[str, list[date]], data_fetch_func: callable) -> dict[date, list[IssueTagResult | IssueCodeNTime | IssueLinkTagCode]]:
+    def get_image_group_by_date(self, target_date: dict[str, list[date]], data_fetch_func: callable,
+                                bulk: bool = False, compact: bool = False) -> dict[date, list]:
+        """
+        @param target_date: DateUtil.search_all_date 결과 { "year-month": [date, ...] }
+        @param data_fetch_func: (start, end) 구간의 이슈를 반환하는 조회 함수
+        @param bulk: True 이면 하루 단위가 아니라 월 단위로 한번에 조회한 뒤 날짜별로 분류한다
+        @param compact: True 이면 Vo 대신 Record (NamedTuple) 로 반환한다
+        @return: { date: [issue, ...] }
+        """
+        if bulk:
+            return self._get_image_group_by_date_bulk(target_date, data_fetch_func, compact)
         img_group = {}
         for key in target_date:
             for day in target_date[key]:
-                issues: list[IssueTagResult | IssueCodeNTime | IssueLinkTagCode] = data_fetch_func(day)
+                issues: list[IssueTagResult | IssueCodeNTime | IssueLinkTagCode] = data_fetch_func(day, compact=compact)
                 img_group.setdefault(day, issues)
 
         return img_group
 
-    def get_package_data_by_created_at_range(self, day: datetime) -> list[IssueCodeNTime]:
-        with (Session(self._engine) as session):
-            q = select(
-                Issue.issue_code, Issue.created_at
-            ).where(
-                Issue.is_package == 0,
-                between(
-                    Issue.created_at,
-                    day, day + timedelta(minutes=1440)
-                )
-            ).order_by(Issue.created_at)
+    def _get_image_group_by_date_bulk(self, target_date: dict[str, list[date]], data_fetch_func: callable,
+                                      compact: bool):
+        # 월 단위 구간 조회 1회 -> 생성 일자 기준으로 분류
+        img_group = {day: [] for key in target_date for day in target_date[key]}
+        for key in target_date:
+            if not target_date[key]:
+                continue
+            days = set(target_date[key])
+            start, end = min(days), max(days) + timedelta(days=1)
+            for issue in data_fetch_func(start, end, compact=compact):
+                # between 은 양 끝을 포함하므로 다음 구간의 자정 데이터는 해당 구간에서 분류한다
+                day = self._get_created_date(issue)
+                if day in days:
+                    img_group[day].append(issue)
+        return img_group
+
+    def iter_image_by_date(self, target_date: dict[str, list[date]], data_iter_func: callable,
+                           partition_size: int = 1000, compact: bool = False) -> Iterator[list]:
+        """
+        get_image_group_by_date(bulk=True) 의 스트리밍 버전
+            날짜별로 모으지 않고, 월 단위 구간을 partition_size 개씩 조회하면서 대상 날짜의 이슈만 반환한다
+        @param data_iter_func: (start, end, partition_size) 구간의 이슈를 나눠 반환하는 iter_* 조회 함수
+        """
+        for key in target_date:
+            if not target_date[key]:
+                continue
+            days = set(target_date[key])
+            start, end = min(days), max(days) + timedelta(days=1)
+            for partition in data_iter_func(start, end, partition_size, compact=compact):
+                issues = [issue for issue in partition if self._get_created_date(issue) in days]
+                if issues:
+                    yield issues
+
+    @staticmethod
+    def _get_created_date(issue) -> date:
+        if isinstance(issue, (IssueLinkTagCode, IssueLinkTagCodeRecord)):
+            return issue.issue_created_at.date()
+        return issue.created_at.date()
+
+    def bulk_insert(self, session: Session, model: type[SQLModel], rows: list[dict],
+                    return_keys: bool = True, chunk_size: int = 1000) -> list[int]:
+        """
+        여러 행을 한번에 insert 한다 (chunk_size 행마다 INSERT 1회)
+        @param session: Session Object from sqlmodel (commit 은 호출한 쪽에서)
+        @param model: 테이블 모델
+        @param rows: [{ column: value }]
+        @param return_keys: 생성된 기본키를 반환할지 여부 (False 면 executemany)
+        @return: rows 와 같은 순서의 생성된 기본키
+        """
+        if not rows:
+            return []
+        table = model.__table__
+        if not return_keys:
+            session.exec(insert(table), params=rows)
+            return []
+        key = table.primary_key.columns[0]
+        insert_returning = session.get_bind().dialect.insert_returning
+        keys = []
+        for i in range(0, len(rows), chunk_size):
+            chunk = rows[i:i + chunk_size]
+            if insert_returning:
+                # INSERT 1회로 생성되는 auto increment 값은 VALUES 순서대로 증가한다
+                result = session.exec(insert(table).values(chunk).returning(key))
+                keys.extend(sorted(result.scalars()))
+            elif self._has_consecutive_auto_increment(session):
+                # RETURNING 을 지원하지 않는 MySQL: lastrowid 는 첫번째 행의 값이고 이후 값은 연속이다
+                result = session.exec(insert(table).values(chunk))
+                keys.extend(range(result.lastrowid, result.lastrowid + len(chunk)))
+            else:
+                # 연속이 보장되지 않는다면 (auto_increment_increment > 1, innodb_autoinc_lock_mode = 2) 다시 조회한다
+                result = session.exec(insert(table).values(chunk))
+                keys.extend(self._select_inserted_keys(session, table, key, result.lastrowid, chunk))
+        return keys
+
+    @staticmethod
+    def _select_inserted_keys(session: Session, table, key, lastrowid: int, rows: list[dict]) -> list[int]:
+        """
+        INSERT 1회로 만든 행의 기본키를 SELECT 1회로 조회한다 (auto increment 값이 연속이 아닐 때)
+            INSERT 1회로 만든 행의 auto increment 값은 연속이 아니어도 VALUES 순서대로 증가한다
+            첫번째 행의 기본키 이후의 행을 기본키 순서로 읽고, 넣은 값과 같은 행을 rows 순서대로 찾는다
+            (사이에 다른 session 이 만든 행이 있을 수 있다)
+            DATETIME 은 저장할 때 정밀도가 바뀔 수 있으므로 비교하지 않는다
+        @param lastrowid: INSERT 결과의 lastrowid (MySQL 은 첫번째 행, SQLite 는 마지막 행의 값)
+        @return: rows 와 같은 순서의 기본키
+        """
+        if session.get_bind().dialect.name != "mysql":
+            lastrowid -= len(rows) - 1
+        columns = [table.c[name] for name in rows[0] if not isinstance(table.c[name].type, DateTime)]
+        inserted = iter(session.exec(select(key, *columns).where(key >= lastrowid).order_by(key)).all())
+        keys = []
+        for row in rows:
+            values = tuple(row[column.name] for column in columns)
+            for found_key, *found_values in inserted:
+                if tuple(found_values) == values:
+                    keys.append(found_key)
+                    break
+            else:
+                raise LookupError(f"Failed to find inserted {table.name} row {values}")
+        return keys
+
+    def _has_consecutive_auto_increment(self, session: Session) -> bool:
+        """
+        INSERT 1회로 만든 여러 행의 auto increment 값이 연속인지 확인한다
+            auto_increment_increment 가 1 이고 (Galera, group replication 은 1 보다 크다)
+            innodb_autoinc_lock_mode 가 2 (interleaved, MySQL 8 기본값) 가 아니어야 연속이 보장된다
+        """
+        if self._consecutive_auto_increment is None:
+            try:
+                increment, lock_mode = session.exec(
+                    text("SELECT @@auto_increment_increment, @@innodb_autoinc_lock_mode")
+                ).one()
+                self._consecutive_auto_increment = int(increment) == 1 and int(lock_mode) < 2
+            except Exception as e:
+                print(f"Failed to check auto increment settings")
+                print(f"reason {e}")
+                self._consecutive_auto_increment = False
+        return self._consecutive_auto_increment
+
+    def _stream(self, q, partition_size: int) -> Iterator[Sequence]:
+        # 서버 사이드 커서로 조회하면서 partition_size 개씩 반환한다
+        # 스트리밍 중에는 connection 에 다른 쿼리를 보낼 수 없으므로 unit_of_work 와 별도의 session 을 사용한다
+        # 다음 partition 을 읽기 전에 오래 멈추면 connection 이 끊긴다 (MySQL net_write_timeout, 기본 60초)
+        # 전송처럼 느린 작업에 넘기는 조회는 _iter_windows, _iter_pages_by_id 를 사용한다
+        with Session(self._engine) as stream_session:
+            result = stream_session.exec(q.execution_options(yield_per=partition_size))
+            yield from result.partitions()
+
+    def _iter_windows(self, query_func: callable, start: datetime, end: datetime,
+                      partition_size: int) -> Iterator[Sequence]:
+        # [start, end] 구간을 _windows 로 나누고, 구간마다 결과를 모두 읽은 뒤 partition_size 개씩 반환한다
+        # 반환하는 동안 열어둔 커서가 없으므로 사용하는 쪽에서 오래 멈춰도 된다
+        for window_start, window_end in self._windows(start, end):
+            with self._session() as session:
+                rows = session.exec(query_func(window_start, window_end)).fetchall()
+            for i in range(0, len(rows), partition_size):
+                yield rows[i:i + partition_size]
+
+    @staticmethod
+    def _windows(start: datetime | date, end: datetime | date,
+                 window: timedelta = timedelta(days=1)) -> list[tuple[datetime, datetime]]:
+        """
+        [start, end] 구간을 window 단위로 나눈다
+            _*_query 는 between 으로 양 끝을 포함하므로, 마지막이 아닌 구간은 끝을 1 마이크로초 당겨 겹치지 않게 한다
+        @return: [(구간 시작, 구간 끝)]
+        """
+        start, end = (
+            value if isinstance(value, datetime) else datetime.combine(value, datetime.min.time())
+            for value in (start, end)
+        )
+        windows = []
+        while start < end:
+            window_end = min(start + window, end)
+            windows.append((start, window_end if window_end == end else window_end - timedelta(microseconds=1)))
+            start = window_end
+        return windows or [(start, end)]
+
+    @staticmethod
+    def _package_data_query(start: datetime, end: datetime):
+        return select(
+            Issue.issue_code, Issue.created_at
+        ).where(
+            Issue.is_package == 0,
+            between(
+                Issue.created_at,
+                start, end
+            )
+        ).order_by(Issue.created_at)
+
+    @staticmethod
+    def _sample_data_query(start: datetime, end: datetime):
+        return select(Issue.issue_code, Issue.rotate, IssueTagMatch.tag_code, Issue.created_at
+        ).join(
+            IssueTagMatch, Issue.issue_code == IssueTagMatch.issue_code
+        ).where(
+            between(
+                Issue.created_at,
+                start, end
+            )
+        ).where(
+            #   is_package [1: sample, 0: package] 반대로 되어있다.
+            Issue.is_package == 1
+        ).order_by(Issue.created_at)
+
+    @staticmethod
+    def _sample_issue_tag_match_query(start: datetime, end: datetime):
+        return select(Issue.issue_code, Issue.created_at, Issue.rotate, Issue.package_link,
+                      IssueTagMatch.tag_code
+        ).join(
+            IssueTagMatch, Issue.issue_code == IssueTagMatch.issue_code
+        ).where(
+            between(
+                Issue.created_at,
+                start, end
+            )
+        ).where(
+            Issue.is_package == 1
+        ).order_by(Issue.created_at)
+
+    @staticmethod
+    def _to_issue_code_n_time(row) -> IssueCodeNTime:
+        return IssueCodeNTime(issue_code=row[0], created_at=row[1])
+
+    @staticmethod
+    def _to_issue_tag_result(row) -> IssueTagResult:
+        return IssueTagResult(issue_code=row[0], rotate=row[1], tag_code=row[2], created_at=row[3])
+
+    @staticmethod
+    def _to_issue_link_tag_code(row) -> IssueLinkTagCode:
+        return IssueLinkTagCode(
+            issue_code=row[0], issue_created_at=row[1], rotate=row[2], package_link=row[3], tag_code=row[4]
+        )
 
+    def get_package_data_by_created_at_range(self, day: datetime, end: datetime = None,
+                                             compact: bool = False) -> list[IssueCodeNTime] | list[IssueCodeNTimeRecord]:
+        # end 가 없으면 day 부터 하루 구간을 조회한다
+        with self._session() as session:
+            q = self._package_data_query(day, end or day + timedelta(minutes=1440))
             issue = session.exec(q).fetchall()
-            issue_code_n_time = [
-                IssueCodeNTime(issue_code=row[0], created_at=row[1])
-                    for row in issue
-            ]
+            if compact:
+                return list(map(IssueCodeNTimeRecord._make, issue))
+            issue_code_n_time = [self._to_issue_code_n_time(row) for row in issue]
             return issue_code_n_time
 
-    def get_sample_data_by_created_at_range(self, day: datetime) -> list[IssueTagResult]:
-        with (Session(self._engine) as session):
-            q = select(Issue.issue_code, Issue.rotate, IssueTagMatch.tag_code
-           ).join(
-                IssueTagMatch, Issue.issue_code == IssueTagMatch.issue_code
-            ).where(
-                between(
-                    Issue.created_at,
-                    day, day + timedelta(minutes=1440)
-                )
-            ).where(
-                #   is_package [1: sample, 0: package] 반대로 되어있다.
-                Issue.is_package == 1
-            ).order_by(Issue.created_at)
+    def get_sample_data_by_created_at_range(self, day: datetime, end: datetime = None,
+                                            compact: bool = False) -> list[IssueTagResult] | list[IssueTagRecord]:
+        with self._session() as session:
+            q = self._sample_data_query(day, end or day + timedelta(minutes=1440))
             issue = session.exec(q).fetchall()
-            issue_tag_results = [
-                IssueTagResult(issue_code=row[0], rotate=row[1], tag_code=row[2])
-                                 for row in issue
-            ]
+            if compact:
+                return list(map(IssueTagRecord._make, issue))
+            issue_tag_results = [self._to_issue_tag_result(row) for row in issue]
             return issue_tag_results
 
-    def get_all_sample_date_by_issue_tag_match(self, day: datetime) -> list[IssueLinkTagCode]:
-        with (Session(self._engine) as session):
-            q = select(Issue.issue_code, Issue.created_at, Issue.rotate, Issue.package_link,
-                       IssueTagMatch.tag_code
-           ).join(
-                IssueTagMatch, Issue.issue_code == IssueTagMatch.issue_code
-            ).where(
-                between(
-                    Issue.created_at,
-                    day, day + timedelta(minutes=1440)
-                )
-            ).where(
-                Issue.is_package == 1
-            ).order_by(Issue.created_at)
+    def get_all_sample_date_by_issue_tag_match(self, day: datetime, end: datetime = None,
+                                               compact: bool = False) -> list[IssueLinkTagCode] | list[IssueLinkTagCodeRecord]:
+        with self._session() as session:
+            q = self._sample_issue_tag_match_query(day, end or day + timedelta(minutes=1440))
             issue = session.exec(q).fetchall()
-            issue_link_tag_codes = [
-                IssueLinkTagCode(
-                    issue_code=row[0], issue_created_at=row[1], rotate=row[2], package_link=row[3], tag_code=row[4]
-                ) for row in issue
-            ]
+            if compact:
+                return list(map(IssueLinkTagCodeRecord._make, issue))
+            issue_link_tag_codes = [self._to_issue_link_tag_code(row) for row in issue]
             return issue_link_tag_codes
+
+    def iter_package_data_by_created_at_range(self, start: datetime, end: datetime,
+                                              partition_size: int = 1000,
+                                              compact: bool = False) -> Iterator[list[IssueCodeNTime] | list[IssueCodeNTimeRecord]]:
+        # get_package_data_by_created_at_range 의 나눠 조회하는 버전 (하루 단위로 조회, partition_size 개씩)
+        for partition in self._iter_windows(self._package_data_query, start, end, partition_size):
+            if compact:
+                yield list(map(IssueCodeNTimeRecord._make, partition))
+                continue
+            yield [self._to_issue_code_n_time(row) for row in partition]
+
+    def iter_sample_data_by_created_at_range(self, start: datetime, end: datetime,
+                                             partition_size: int = 1000,
+                                             compact: bool = False) -> Iterator[list[IssueTagResult] | list[IssueTagRecord]]:
+        # get_sample_data_by_created_at_range 의 나눠 조회하는 버전 (하루 단위로 조회, partition_size 개씩)
+        for partition in self._iter_windows(self._sample_data_query, start, end, partition_size):
+            if compact:
+                yield list(map(IssueTagRecord._make, partition))
+                continue
+            yield [self._to_issue_tag_result(row) for row in partition]
+
+    def iter_all_sample_date_by_issue_tag_match(self, start: datetime, end: datetime,
+                                                partition_size: int = 1000,
+                                                compact: bool = False) -> Iterator[list[IssueLinkTagCode] | list[IssueLinkTagCodeRecord]]:
+        # get_all_sample_date_by_issue_tag_match 의 나눠 조회하는 버전 (하루 단위로 조회, partition_size 개씩)
+        for partition in self._iter_windows(self._sample_issue_tag_match_query, start, end, partition_size):
+            if compact:
+                yield list(map(IssueLinkTagCodeRecord._make, partition))
+                continue
+            yield [self._to_issue_link_tag_code(row) for row in partition]
+
     def get_all_sample_date_by_package_link(self, package_link: str):
-        with (Session(self._engine) as session):
+        with self._session() as session:
             q = select(Issue.issue_code, Issue.created_at, Issue.rotate, Issue.package_link
             ).where(
                 Issue.package_link == package_link
@@ -106,16 +414,46 @@ class ORM:
             issue = session.exec(q).fetchall()
             return issue
 
+    def get_all_sample_data_by_package_link_in(self, package_links: set[str],
+                                               chunk_size: int = 1000) -> dict[str, dict[int, Row]]:
+        """
+        get_all_sample_date_by_package_link 의 일괄 조회 버전
+        같은 회전값이 여러개라면 get_all_sample_date_by_package_link 와 같이 나중에 생성된 행이 우선한다
+        @param package_links: 조회할 package_link 목록
+        @param chunk_size: IN 절에 한번에 넣을 package_link 수
+        @return: { package_link: { rotate: (issue_code, created_at, rotate, package_link) } }
+        """
+        links = list(package_links)
+        rotations = {}
+        with self._session() as session:
+            for i in range(0, len(links), chunk_size):
+                for row in session.exec(self._package_link_in_query(links[i:i + chunk_size])).fetchall():
+                    rotations.setdefault(row.package_link, {})[row.rotate] = row
+        return rotations
+
+    @staticmethod
+    def _package_link_in_query(package_links: list[str]):
+        return select(
+            Issue.issue_code, Issue.created_at, Issue.rotate, Issue.package_link
+        ).where(
+            Issue.package_link.in_(package_links)
+        ).where(
+            Issue.is_package == 1
+        ).order_by(Issue.created_at)
+
     def get_barcode_by_issue_code(self, issue_code: str):
-        with (Session(self._engine) as session):
-            q = select(
-                IssueTagMatch.tag_code
-            ).where(IssueTagMatch.issue_code == issue_code)
-            barcode = session.exec(q).one_or_none()
+        with self._session() as session:
+            barcode = session.exec(self._barcode_by_issue_code_query(issue_code)).one_or_none()
             return barcode
 
+    @staticmethod
+    def _barcode_by_issue_code_query(issue_code: str):
+        return select(
+            IssueTagMatch.tag_code
+        ).where(IssueTagMatch.issue_code == issue_code)
+
     def get_tag_by_tag_code(self, tag_code: str):
-        with (Session(self._engine) as session):
+        with self._session() as session:
             q = select(
                 TagLite.tag_name, TagLite.tag_code, TagLite.barcode, TagLite.link_barcode
             ).where(
@@ -130,26 +468,104 @@ class ORM:
                 tag = tag[-1]
             return tag
 
+    def get_tag_index(self, tag_codes: set[str] | None = None, chunk_size: int = 1000) -> dict[str, Row]:
+        """
+        tag_code, barcode, link_barcode 모두를 키로 하는 태그 인덱스
+        get_tag_by_tag_code 와 같이 중복된 경우 마지막 행이 우선한다
+        @param tag_codes: 필요한 코드 목록 (None 이면 tag 테이블 전체)
+        @param chunk_size: IN 절에 한번에 넣을 코드 수
+        @return: { code: (id, tag_name, tag_code, barcode, link_barcode) }
+        """
+        with self._session() as session:
+            if tag_codes is None:
+                rows = session.exec(self._tag_index_query()).fetchall()
+            else:
+                codes = list(tag_codes)
+                rows = [
+                    row
+                    for i in range(0, len(codes), chunk_size)
+                    for row in session.exec(self._tag_index_query(codes[i:i + chunk_size])).fetchall()
+                ]
+        return self._to_tag_index(rows)
+
+    @staticmethod
+    def _tag_index_query(codes: list[str] | None = None):
+        # codes 가 없으면 tag 테이블 전체
+        columns = select(TagLite.id, TagLite.tag_name, TagLite.tag_code, TagLite.barcode, TagLite.link_barcode)
+        if codes is None:
+            return columns.order_by(TagLite.id)
+        return columns.where(
+            TagLite.tag_code.in_(codes) |
+            TagLite.barcode.in_(codes) |
+            TagLite.link_barcode.in_(codes)
+        )
+
+    @staticmethod
+    def _to_tag_index(rows: Iterable[Row]) -> dict[str, Row]:
+        # 여러 chunk 에서 중복 조회된 행은 하나로, id 순서로 넣으므로 중복된 코드는 마지막 행이 우선한다
+        rows_by_id = {row.id: row for row in rows}
+        tag_index = {}
+        for key in sorted(rows_by_id):
+            row = rows_by_id[key]
+            for code in (row.tag_code, row.barcode, row.link_barcode):
+                if code is not None:
+                    tag_index[code] = row
+        return tag_index
+
     def get_all_issue_count(self):
-        with Session(self._engine) as session:
+        with self._session() as session:
             q = select(func.count()).select_from(Issue)
             count= session.exec(q)
             return count.fetchall()[0]
 
     def get_issue_by_id(self, id: int):
-        with Session(self._engine) as session:
+        with self._session() as session:
             q = select(Issue).limit(1).offset(id)
             result = session.exec(q).one_or_none()
             return result
 
+    def iter_issue_pages(self, where=None, page_size: int = 1000, after_id: int = 0) -> Iterator[Sequence[Issue]]:
+        """
+        Issue 전체를 id 순서로 page_size 개씩 조회한다 (get_issue_by_id 의 OFFSET 대신 keyset)
+        @param where: 추가 조건 (예: Issue.is_package == 1)
+        @param after_id: 이 id 다음부터 조회 (중단된 경우 마지막 페이지의 마지막 id 로 이어서 조회)
+        """
+        yield from self._iter_pages_by_id(Issue, where, page_size, after_id)
+
+    def iter_issue_tag_match_pages(self, where=None, page_size: int = 1000,
+                                   after_id: int = 0) -> Iterator[Sequence[IssueTagMatch]]:
+        # iter_issue_pages 의 IssueTagMatch 버전
+        yield from self._iter_pages_by_id(IssueTagMatch, where, page_size, after_id)
+
+    def _iter_pages_by_id(self, model: type[SQLModel], where, page_size: int, after_id: int,
+                          options: Iterable = (), session: Session = None) -> Iterator[Sequence]:
+        # WHERE id > last_id ORDER BY id LIMIT page_size 반복 (id 는 model 의 기본키, Question 은 seq)
+        # 페이지마다 결과를 모두 읽은 뒤 반환하므로, 사용하는 쪽에서 같은 connection 으로 다른 쿼리를 보내도 된다
+        # options: 페이지마다 적용할 loader 옵션 (selectinload 등)
+        # session: 사용할 session, 없으면 페이지마다 _session
+        key = model.__mapper__.primary_key[0]
+        last_id = after_id
+        while True:
+            with nullcontext(session) if session is not None else self._session() as page_session:
+                q = select(model).where(key > last_id)
+                if where is not None:
+                    q = q.where(where)
+                page = page_session.exec(q.options(*options).order_by(key).limit(page_size)).all()
+            if not page:
+                return
+            yield page
+            if len(page) < page_size:
+                return
+            last_id = getattr(page[-1], key.key)
+
     def get_issue_tag_match_by_issue_code(self, issue_code: str):
-        with Session(self._engine) as session:
+        with self._session() as session:
             q = select(IssueTagMatch).where(IssueTagMatch.issue_code == issue_code)
             result = session.exec(q).fetchall()
             return result
 
     def get_tag_by_tag_code_or_barcode_or_link_barcode(self, tag_code: str):
-        with Session(self._engine) as session:
+        with self._session() as session:
             q = select(TagFull).where(
                 (TagFull.tag_code == tag_code) |
                 (TagFull.barcode == tag_code) |
@@ -161,24 +577,32 @@ class ORM:
             else:
                 return None
 
+    @staticmethod
+    def _issue_by_tag_type_query(tag_type: str):
+        return select(
+            Issue.issue_code, Issue.created_at
+        ).join(
+            IssueTagMatch, Issue.issue_code == IssueTagMatch.issue_code
+        ).join(
+            TagFull, IssueTagMatch.tag_code == TagFull.tag_code
+        ).where(
+            TagFull.tag_type == tag_type
+        ).order_by(
+            desc(Issue.created_at)
+        )
+
     def get_issue_by_tag_type(self, tag_type: str):
-        with Session(self._engine) as session:
-            q = select(
-                Issue.issue_code, Issue.created_at
-            ).join(
-                IssueTagMatch, Issue.issue_code == IssueTagMatch.issue_code
-            ).join(
-                TagFull, IssueTagMatch.tag_code == TagFull.tag_code
-            ).where(
-                TagFull.tag_type == tag_type
-            ).order_by(
-                desc(Issue.created_at)
-            )
+        with self._session() as session:
+            q = self._issue_by_tag_type_query(tag_type)
             result = session.exec(q).fetchall()
             return result
 
+    def iter_issue_by_tag_type(self, tag_type: str, partition_size: int = 1000) -> Iterator[Sequence[Row]]:
+        # get_issue_by_tag_type 의 스트리밍 버전 (partition_size 개씩)
+        yield from self._stream(self._issue_by_tag_type_query(tag_type), partition_size)
+
     def get_question_data_img_id_by_question_seq(self, seq: int) -> Sequence[QuestionData.image_id]:
-        with Session(self._engine) as session:
+        with self._session() as session:
             q = select(
                 QuestionData.image_id
             ).where(
@@ -188,11 +612,15 @@ class ORM:
             return result
 
     def get_all_question_seq(self):
-        with Session(self._engine) as session:
+        with self._session() as session:
             q = select(Question.seq)
             result = session.exec(q).fetchall()
             return result
 
+    def iter_all_question_seq(self, partition_size: int = 1000) -> Iterator[Sequence[int]]:
+        # get_all_question_seq 의 스트리밍 버전 (partition_size 개씩)
+        yield from self._stream(select(Question.seq).order_by(Question.seq), partition_size)
+
     def get_all_question_by_type(self, session: Session, category: CategoryEnum = None) -> Sequence[Question]:
         """
         @param session: Session Object from sqlmodel
@@ -208,8 +636,34 @@ class ORM:
         result = session.exec(q).fetchall()
         return result
 
+    def iter_all_question_by_type(self, session: Session, category: CategoryEnum = None,
+                                  batch_size: int = 500) -> Iterator[Question]:
+        """
+        get_all_question_by_type 의 스트리밍 버전
+            문제에 연결된 제목, 해설, 난이도, 문제 데이터, 옵션 (텍스트, 데이터)을 batch 마다 테이블별로 1회씩 함께 조회한다
+            batch_size 개씩 나누어 조회하므로 메모리 사용량이 문제 수와 관계없이 일정하다
+            seq 기준 keyset 페이지로 조회한다 (yield_per 의 스트리밍 커서는 selectinload 쿼리와 connection 을 같이 사용할 수 없다)
+        @param session: Session Object from sqlmodel
+        @param category: CategoryEnum (READING, MATERIAL, DANGER)
+        @param batch_size: 한번에 불러올 문제 수
+        """
+        where = Question.category == category if category else None
+        for page in self._iter_pages_by_id(Question, where, batch_size, 0, self._question_graph_options(), session):
+            yield from page
+
+    @staticmethod
+    def _question_graph_options():
+        return (
+            selectinload(Question.title),
+            selectinload(Question.solution),
+            selectinload(Question.difficulty),
+            selectinload(Question.questions_data),
+            selectinload(Question.options).selectinload(Option.included_text),
+            selectinload(Question.options).selectinload(Option.option_data),
+        )
+
     def get_all_option_data_img_id_by_question_seq(self, question_seq: int) -> Sequence[str]:
-        with Session(self._engine) as session:
+        with self._session() as session:
             q = select(
                 OptionData.image_id
             ).join(
@@ -218,6 +672,112 @@ class ORM:
             result = session.exec(q).fetchall()
             return result
 
+    def get_all_question_and_option_img_id(self) -> Sequence[Row]:
+        """
+        모든 문제의 문제 이미지, 옵션 이미지를 한번에 조회한다
+        @return: [(question_seq, image_id, source: "question" | "option")]
+        """
+        with self._session() as session:
+            result = session.exec(self._question_and_option_img_id_query()).fetchall()
+            return result
+
+    def iter_all_question_and_option_img_id(self, partition_size: int = 1000) -> Iterator[Sequence[Row]]:
+        # get_all_question_and_option_img_id 의 나눠 조회하는 버전 (question_seq 순서)
+        # 문제 seq 를 partition_size 개씩 keyset 으로 나누고, 해당 문제들의 이미지를 모두 읽은 뒤 반환한다
+        for page in self._iter_pages_by_id(Question, None, partition_size, 0):
+            q = self._question_and_option_img_id_query(page[0].seq, page[-1].seq)
+            with self._session() as session:
+                rows = session.exec(q.order_by(q.selected_columns.question_seq)).fetchall()
+            if rows:
+                yield rows
+
+    @staticmethod
+    def _question_and_option_img_id_query(first_seq: int = None, last_seq: int = None):
+        # first_seq, last_seq 가 있으면 해당 구간 (양 끝 포함) 의 문제만
+        question_q = select(
+            QuestionData.question_seq, QuestionData.image_id, literal("question").label("source")
+        )
+        option_q = select(
+            Option.question_seq, OptionData.image_id, literal("option").label("source")
+        ).join(
+            Option, OptionData.option_seq == Option.seq
+        )
+        if first_seq is not None:
+            question_q = question_q.where(between(QuestionData.question_seq, first_seq, last_seq))
+            option_q = option_q.where(between(Option.question_seq, first_seq, last_seq))
+        return union_all(question_q, option_q)
+
+    def get_language_seq_by_kr_in(self, texts: Iterable[str], chunk_size: int = 1000) -> dict[str, int]:
+        """
+        @param texts: 조회할 kr 목록
+        @param chunk_size: IN 절에 한번에 넣을 kr 수
+        @return: { kr: Language.seq } (같은 kr 이 여러개라면 가장 작은 seq, 없는 kr 은 빠진다)
+        """
+        texts = list(set(texts))
+        result = {}
+        with self._session() as session:
+            for i in range(0, len(texts), chunk_size):
+                q = select(
+                    Language.kr, Language.seq
+                ).where(
+                    Language.kr.in_(texts[i:i + chunk_size])
+                ).order_by(desc(Language.seq))
+                result.update({kr: seq for kr, seq in session.exec(q)})
+        return result
+
+    def get_reference_rows(self, model: type[SQLModel]) -> list[SQLModel]:
+        """
+        Difficulty 처럼 작은 참조 테이블을 처음 한번만 전부 읽고, 이후에는 캐시에서 반환한다
+        @return: 세션에서 분리된 row 목록
+        """
+        if model not in self._reference_cache:
+            # unit_of_work 의 session 에서 expunge_all 하지 않도록 별도의 session 을 사용한다
+            with Session(self._engine) as reference_session:
+                rows = list(reference_session.exec(select(model)).all())
+                reference_session.expunge_all()
+            self._reference_cache[model] = rows
+        return self._reference_cache[model]
+
+    def invalidate_reference_cache(self, model: type[SQLModel] = None):
+        # model 이 없으면 전체 삭제
+        if model is None:
+            self._reference_cache.clear()
+        else:
+            self._reference_cache.pop(model, None)
+
+    def enable_query_cache(self, cache: QueryCache, methods: dict[str, float] | None = None):
+        """
+        읽기 전용 메서드의 결과를 cache 에 저장하고, 같은 인자로 다시 호출하면 DB 를 조회하지 않는다
+            디스크 캐시는 접속 주소별로 구분한다 (같은 파일을 여러 DB 가 같이 사용할 수 있다)
+            save 후에는 모두 삭제한다
+        @param methods: { 메서드 이름: 보관 시간 (초) }, 없으면 QUERY_CACHE_TTL
+        """
+        scope = self._query_cache_scope()
+        for name, ttl in (methods or self.QUERY_CACHE_TTL).items():
+            method = getattr(type(self), name)
+            setattr(self, name, cache.cached(method.__get__(self), f"ORM.{name}", ttl=ttl, scope=scope))
+        self._query_cache = cache
+
+    def _query_cache_scope(self) -> str:
+        return self._engine.url.render_as_string(hide_password=True)
+
+    def invalidate_query_cache(self, method: str = None):
+        # method 가 없으면 전체 삭제
+        if self._query_cache is not None:
+            self._query_cache.invalidate(f"ORM.{method}" if method else None, scope=self._query_cache_scope())
+
+    def get_difficulty_seq(self, name: str) -> int | None:
+        for difficulty in self.get_reference_rows(Difficulty):
+            if difficulty.name == name:
+                return difficulty.seq
+        return None
+
+    def get_difficulty_name(self, seq: int) -> DifficultyEnum | None:
+        for difficulty in self.get_reference_rows(Difficulty):
+            if difficulty.seq == seq:
+                return difficulty.name
+        return None
+
     def get_difficulty_by_name(self, session, name: str) -> Difficulty:
         # with Session(self._engine) as session:
         q = select(Difficulty).where(Difficulty.name == name)
@@ -225,7 +785,7 @@ class ORM:
         return result
 
     def get_all_question_by_seq_in(self, seq_list: list[int]):
-        with Session(self._engine) as session:
+        with self._session() as session:
             q = select(Question).where(Question.seq.in_(seq_list))
             result = session.exec(q).fetchall()
             return result
@@ -0,0 +1,109 @@
+import copy
+import functools
+from collections.abc import Callable, Hashable
+
+from src.extraction_tools.util.metrics import METRICS
+from src.extraction_tools.util.ttl_cache import TTLCache, DiskTTLCache
+
+# None 결과도 캐시하기 위한 표시 (get_barcode_by_issue_code 처럼 없으면 None 을 반환하는 경우)
+_MISSING = object()
+
+
+class QueryCache:
+    def __init__(self, path: str | None = None, default_ttl: float | None = 300.0, max_size: int = 4096):
+        """
+        읽기 전용 조회 결과를 메서드별로 캐시한다
+            메모리 (TTLCache) -> 디스크 (DiskTTLCache, path 가 있을 때) -> DB 순서로 찾는다
+            디스크에서 찾은 값은 메모리에도 넣는다
+            list, dict, set 결과는 복사해서 저장하고 반환한다 (호출한 쪽에서 수정해도 캐시는 그대로)
+        path: 디스크 캐시 파일 경로 (SQLite), 있으면 CLI 를 다시 실행해도 ttl 동안 결과를 재사용한다
+        default_ttl: cached 에 ttl 을 주지 않은 메서드의 보관 시간 (초), None 이면 만료되지 않는다
+        max_size: cached 에 max_size 를 주지 않은 메서드의 최대 보관 개수 (LRU)
+        """
+        self.path = path
+        self.default_ttl = default_ttl
+        self.max_size = max_size
+        # { (scope, name): (메모리 캐시, 디스크 캐시) }
+        self._caches: dict[tuple[str, str], tuple[TTLCache, DiskTTLCache | None]] = {}
+
+    def cached(self, func: Callable, name: str, ttl: float | None = _MISSING, max_size: int | None = None,
+               scope: str = "") -> Callable:
+        """
+        func 의 결과를 인자별로 캐시하는 함수를 반환한다
+        @param name: 통계와 invalidate 에 사용할 이름 (예: ORM.get_tag_by_tag_code)
+        @param ttl: 이 메서드의 보관 시간 (초), 주지 않으면 default_ttl
+        @param scope: 디스크 캐시에서 다른 DB 의 결과와 섞이지 않도록 구분할 값 (예: 접속 주소)
+        """
+        ttl = self.default_ttl if ttl is _MISSING else ttl
+        max_size = max_size or self.max_size
+        memory = TTLCache(max_size=max_size, ttl=ttl)
+        disk = DiskTTLCache(self.path, namespace=f"{scope}:{name}", max_size=max_size, ttl=ttl) if self.path else None
+        self._caches[(scope, name)] = (memory, disk)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = self._key(args, kwargs)
+            value = memory.get(key, _MISSING)
+            if value is _MISSING and disk is not None:
+                value = disk.get(key, _MISSING)
+                if value is not _MISSING:
+                    memory.set(key, value)
+            if value is not _MISSING:
+                METRICS.inc("query_cache_hits_total", method=name)
+                return self._detach(value)
+            METRICS.inc("query_cache_misses_total", method=name)
+            value = func(*args, **kwargs)
+            memory.set(key, self._detach(value))
+            if disk is not None:
+                disk.set(key, value)
+            return value
+
+        wrapper.cache_name = name
+        return wrapper
+
+    @staticmethod
+    def _detach(value):
+        # 변경할 수 있는 결과는 얕은 복사 (Row, str, int 등은 그대로)
+        if isinstance(value, (list, dict, set)):
+            return copy.copy(value)
+        return value
+
+    @staticmethod
+    def _key(args: tuple, kwargs: dict) -> Hashable:
+        # set, list 인자도 키로 사용할 수 있도록 변환 (set 은 순서와 무관하게 같은 키)
+        def normalize(value):
+            if isinstance(value, (set, frozenset)):
+                return "set", tuple(sorted(value, key=repr))
+            if isinstance(value, (list, tuple)):
+                return tuple(normalize(v) for v in value)
+            if isinstance(value, dict):
+                return "dict", tuple(sorted((k, normalize(v)) for k, v in value.items()))
+            return value
+        return normalize(args), tuple(sorted((k, normalize(v)) for k, v in kwargs.items()))
+
+    def invalidate(self, name: str | None = None, scope: str | None = None):
+        # name, scope 가 없으면 전체 삭제 (디스크 캐시 포함)
+        for (cache_scope, cache_name), caches in self._caches.items():
+            if (name is None or cache_name == name) and (scope is None or cache_scope == scope):
+                for cache in caches:
+                    if cache is not None:
+                        cache.invalidate()
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """
+        @return: { name: {"hits", "misses", "size"} } (scope 별 합계, hits 는 메모리 + 디스크, size 는 메모리 캐시 개수)
+        """
+        result = {}
+        for (_, name), (memory, disk) in self._caches.items():
+            disk_hits = disk.hits if disk is not None else 0
+            stats = result.setdefault(name, {"hits": 0, "misses": 0, "size": 0})
+            stats["hits"] += memory.hits + disk_hits
+            # 메모리에서 못 찾고 디스크에서 찾은 경우는 miss 가 아니다
+            stats["misses"] += memory.misses - disk_hits
+            stats["size"] += len(memory)
+        return result
+
+    def close(self):
+        for _, disk in self._caches.values():
+            if disk is not None:
+                disk.close()
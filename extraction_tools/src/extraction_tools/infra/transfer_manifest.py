@@ -0,0 +1,97 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+
+class TransferManifest:
+    def __init__(self, path: str = "transfer_manifest.db", checksum: bool = False, commit_interval: int = 100):
+        """
+        전송이 끝난 원격 파일 목록 (SQLite)
+        path: 매니페스트 파일 경로
+        checksum: True 면 기록할 때 로컬 파일의 sha256 을 함께 저장하고, is_transferred 에서 로컬 파일과 비교한다
+        commit_interval: 기록 n 건마다 커밋 (중단되면 마지막 커밋 이후 기록만 다시 전송된다)
+        """
+        self.checksum = checksum
+        self._commit_interval = commit_interval
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS transfer (
+                remote_path TEXT PRIMARY KEY,
+                local_path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime INTEGER NOT NULL,
+                checksum TEXT,
+                transferred_at TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get(self, remote_path: str) -> tuple[str, int, int, str | None] | None:
+        # (local_path, size, mtime, checksum)
+        with self._lock:
+            return self._conn.execute(
+                "SELECT local_path, size, mtime, checksum FROM transfer WHERE remote_path = ?",
+                (remote_path,)
+            ).fetchone()
+
+    def is_transferred(self, remote_path: str, local_path: str, size: int, mtime: float) -> bool:
+        """
+        원격 파일의 크기, 수정 시간이 기록과 같고 로컬 파일이 남아있다면 True
+            checksum 을 사용한다면 로컬 파일의 sha256 도 기록과 같아야 한다 (기록에 없다면 다시 전송)
+        """
+        row = self.get(remote_path)
+        if not row:
+            return False
+        recorded_local_path, recorded_size, recorded_mtime, recorded_checksum = row
+        unchanged = (
+            recorded_local_path == local_path
+            and recorded_size == size
+            and recorded_mtime == int(mtime)
+            and os.path.isfile(local_path)
+            and os.path.getsize(local_path) == size
+        )
+        if not unchanged or not self.checksum:
+            return unchanged
+        return recorded_checksum == self._sha256(local_path)
+
+    def record(self, remote_path: str, local_path: str, size: int, mtime: float):
+        checksum = self._sha256(local_path) if self.checksum else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO transfer VALUES (?, ?, ?, ?, ?, ?)",
+                (remote_path, local_path, size, int(mtime), checksum, datetime.now().isoformat())
+            )
+            self._pending += 1
+            if self._pending >= self._commit_interval:
+                self._conn.commit()
+                self._pending = 0
+
+    def invalidate(self, remote_path: str = None):
+        # remote_path 가 없으면 전체 삭제
+        with self._lock:
+            if remote_path is None:
+                self._conn.execute("DELETE FROM transfer")
+            else:
+                self._conn.execute("DELETE FROM transfer WHERE remote_path = ?", (remote_path,))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+    @staticmethod
+    def _sha256(path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
@@ -5,14 +5,17 @@ from datetime import datetime
 from dotenv import load_dotenv
 
 from src.extraction_tools.client.ssh_client import SSHClient
-from src.extraction_tools.dto.Vo import HostInformation, DatabaseInformation, ExamDataVo
+from src.extraction_tools.dto.Vo import HostInformation, DatabaseInformation
 from src.extraction_tools.infra.orm import ORM
+from src.extraction_tools.infra.query_cache import QueryCache
+from src.extraction_tools.infra.transfer_manifest import TransferManifest
 from src.extraction_tools.service.data_handling_service import DataHandlingService
 from src.extraction_tools.service.exam_build_service import ExamBuildService
 from src.extraction_tools.service.image_extract_service import ImageExtractService
 from src.extraction_tools.service.image_upload_service import ImageUploadService
 from src.extraction_tools.util.date_util import DateUtil
 from src.extraction_tools.util.directory_util import DirectoryUtil
+from src.extraction_tools.util.metrics import METRICS, report_metrics
 
 
 class ExtractionToolApplication:
@@ -38,6 +41,7 @@ class ExtractionToolApplication:
         self.date_util = date_module
         self.exam_build_service = exam_build_module
 
+    @report_metrics
     async def process_upload_all_sample_images(self):
         # 기간내의 모든 샘플 이미지를 업로드
         target_date = self.date_util.search_all_date(datetime(2023, 1, 1), datetime(2024, 12, 31))
@@ -47,6 +51,7 @@ class ExtractionToolApplication:
             self.upload_path
         )
 
+    @report_metrics
     async def upload_all_package_images(self):
         # 기간내의 모든 패키지 이미지를 업로드
         target_date = self.date_util.search_all_date(datetime(2023, 1, 1), datetime(2024, 8, 31))
@@ -56,39 +61,44 @@ class ExtractionToolApplication:
             self.upload_path
         )
 
+    @report_metrics
     def process_find_empty_file(self):
         # 빈 파일 찾아서 바코드로 변환하여 반환
         return self.data_handling_util.find_empty_file()
 
+    @report_metrics
     def process_export_missing_sample(self):
         # 누락된 샘플데이터 리스트를 엑셀로 추출
         target_date = self.date_util.search_all_date(datetime(2023, 1, 1), datetime(2024, 8, 31))
         self.data_handling_util.find_missing_sample(target_date)
 
+    @report_metrics
     async def process_extract_exam_image(self):
         await self.img_extract_service.extract_target_questions_and_option_images(
             self.download_path,
             self.upload_path
         )
 
+    @report_metrics
     def process_extract_exam_data(self):
         """
         시험 데이터 추출
         문제, 문제 데이터, 옵션, 옵션 데이터 (시퀀스 빼고 모두 추출)
+        한 줄에 문제 하나씩 (NDJSON) 저장
         @return: None
         """
-        resp = self.exam_build_service.extract_exam_data()
-        with open("exam_data.json", "w", encoding="utf-8") as f:
-            f.write(resp.model_dump_json())
+        self.exam_build_service.export_exam_data("exam_data.ndjson")
 
+    @report_metrics
     def process_merge_exam_data(self):
-        with open("exam_data.json", "r", encoding="utf-8") as f:
-            data = ExamDataVo.model_validate_json(f.read())
-            self.exam_build_service.merge_exam_data(data)
+        data = self.exam_build_service.load_exam_data("exam_data.ndjson")
+        self.exam_build_service.merge_exam_data(data, bulk=True)
 
+    @report_metrics
     def process_clean_exam_data(self):
         self.exam_build_service.clean_exam_data()
 
+    @report_metrics
     def process_build_exam(self):
         self.exam_build_service.make_mock_exam()
 
@@ -98,6 +108,10 @@ if __name__ == '__main__':
     date_util = DateUtil()
     directory_util = DirectoryUtil()
     load_dotenv()
+    # 각 process 가 끝날 때 측정값을 저장할 파일 (.prom: Prometheus text, 그 외 JSON, "{name}" 은 process 이름)
+    METRICS.dump_path = os.getenv("METRICS_DUMP")
+    # 반복 조회 결과 캐시 (QUERY_CACHE_PATH 가 있으면 파일에도 저장해서 다음 실행에서도 사용한다)
+    query_cache = QueryCache(path=os.getenv("QUERY_CACHE_PATH"))
 
     remote_host = HostInformation(
         ip=os.getenv("REMOTE_HOST_IP"),
@@ -107,7 +121,8 @@ if __name__ == '__main__':
     ssh = SSHClient(
         host=remote_host.ip,
         username=remote_host.name,
-        password=remote_host.password
+        password=remote_host.password,
+        manifest=TransferManifest("transfer_manifest.db")
     )
 
     db_information = DatabaseInformation(
@@ -124,7 +139,13 @@ if __name__ == '__main__':
         db_password=db_information.password,
         db_name=db_information.db_name,
         port=db_information.port,
+        pool_size=db_information.pool_size,
+        max_overflow=db_information.max_overflow,
+        pool_timeout=db_information.pool_timeout,
+        pool_recycle=db_information.pool_recycle,
+        pool_pre_ping=db_information.pool_pre_ping,
     )
+    db.enable_query_cache(query_cache)
 
     image_upload_service = ImageUploadService(
         ssh_client=ssh,
@@ -145,7 +166,13 @@ if __name__ == '__main__':
         db_password=exam_db_information.password,
         db_name=exam_db_information.db_name,
         port=exam_db_information.port,
+        pool_size=exam_db_information.pool_size,
+        max_overflow=exam_db_information.max_overflow,
+        pool_timeout=exam_db_information.pool_timeout,
+        pool_recycle=exam_db_information.pool_recycle,
+        pool_pre_ping=exam_db_information.pool_pre_ping,
     )
+    exam_db.enable_query_cache(query_cache)
 
     image_extract_service = ImageExtractService(
         db_client=exam_db,
@@ -168,6 +195,11 @@ if __name__ == '__main__':
         img_extract_module=image_extract_service,
         exam_build_module=exam_build_service
     )
-    # application.process_merge_exam_data()
-    # application.process_clean_exam_data()
-    application.process_build_exam()
+    try:
+        # application.process_merge_exam_data()
+        # application.process_clean_exam_data()
+        application.process_build_exam()
+    finally:
+        # 채널을 닫고, 마지막 commit 이후의 전송 기록 (manifest) 과 캐시를 저장한다
+        ssh.close()
+        query_cache.close()
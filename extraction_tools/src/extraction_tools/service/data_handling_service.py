@@ -5,6 +5,7 @@ import pandas as pd
 
 from src.extraction_tools.infra.orm import ORM
 from src.extraction_tools.util.directory_util import DirectoryUtil
+from src.extraction_tools.util.metrics import METRICS
 
 
 class DataHandlingService:
@@ -16,13 +17,12 @@ class DataHandlingService:
         # 모종의 사고로 유실된 쁘락치 파일 찾기
         # 사이즈가 0인 파일을 찾아서 해당 파일의 이름을 바코드로 변환하여 반환
         resp = []
-        self.directory_util.find_target_file(f"input")
-        empty_files: set[str] = self.directory_util.target_container
-        for empty_file in empty_files:
-            target = empty_file.split("\\")[-1].split("_")[0]
-            barcode = self.db_client.get_barcode_by_issue_code(target)
-            if barcode:
-                resp.append(barcode)
+        with self.db_client.unit_of_work(commit=False):
+            for empty_file in self.directory_util.find_target_file(f"input"):
+                target = empty_file.split("\\")[-1].split("_")[0]
+                barcode = self.db_client.get_barcode_by_issue_code(target)
+                if barcode:
+                    resp.append(barcode)
 
         return resp
 
@@ -34,8 +34,9 @@ class DataHandlingService:
     def extract_file(self, target: str, destination: str, new_name: str, position: str):
         shutil.move(f"{target}/color.jpg", f"{destination}/{new_name}_{position}_color.jpg")
 
-    def _save_to_excel(self, merge_rotate_group):
+    def _save_to_excel(self, merge_rotate_group, output_path: str = f"input"):
         # 엑셀로 저장
+        # 행은 [issue_code, created_at, rotate, package_link, tag_name, tag_code] (+ 파일 확인 결과 top, side)
         result_group = {}
         count = 0
         for day, issue_arr in merge_rotate_group.items():
@@ -44,38 +45,55 @@ class DataHandlingService:
                     result_group[count] = {
                         "img_name": v[0][0],
                         "barcode_name": v[0][5],
-                        "0_top": v[0][6],
-                        "0_side": v[0][7],
-                        "45_top": v[45][6],
-                        "45_side": v[45][7],
-                        "90_top": v[90][6],
-                        "90_side": v[90][7],
+                        "0_top": self._cell(v, 0, 6),
+                        "0_side": self._cell(v, 0, 7),
+                        "45_top": self._cell(v, 45, 6),
+                        "45_side": self._cell(v, 45, 7),
+                        "90_top": self._cell(v, 90, 6),
+                        "90_side": self._cell(v, 90, 7),
                         "created_date": str(v[0][1]).split(" ")[0],
                         "created_time": str(v[0][1]).split(" ")[1]
                     }
                     count += 1
         df = pd.DataFrame.from_dict(result_group, orient="index")
-        df.to_excel(f"input")
+        df.to_excel(output_path)
 
-    def find_missing_sample(self, target_date):
+    @staticmethod
+    def _cell(rotations: dict, rotate: int, index: int):
+        # 회전된 이슈가 없거나 파일 확인 결과가 없다면 "None"
+        row = rotations.get(rotate)
+        if row is None or len(row) <= index:
+            return "None"
+        return row[index]
+
+    def find_missing_sample(self, target_date, output_path: str = f"input"):
         # 샘플 데이터 누락 확인
-        img_group = self.db_client.get_image_group_by_date(
-            target_date,
-            self.db_client.get_sample_data_by_created_at_range
-        )
-        merge_img_and_tag_group = self._merge_images_and_tags(img_group)
-        merge_rotate_group = self._merge_rotations(merge_img_and_tag_group)
-        self._save_to_excel(merge_rotate_group)
+        # output_path: 결과 엑셀 파일 경로
+        with self.db_client.unit_of_work(commit=False):
+            with METRICS.timer("stage_seconds", stage="find_missing_sample.fetch"):
+                img_group = self.db_client.get_image_group_by_date(
+                    target_date,
+                    self.db_client.get_all_sample_date_by_issue_tag_match,
+                    bulk=True,
+                    compact=True
+                )
+            with METRICS.timer("stage_seconds", stage="find_missing_sample.merge_tags"):
+                merge_img_and_tag_group = self._merge_images_and_tags(img_group)
+            with METRICS.timer("stage_seconds", stage="find_missing_sample.merge_rotations"):
+                merge_rotate_group = self._merge_rotations(merge_img_and_tag_group)
+        with METRICS.timer("stage_seconds", stage="find_missing_sample.save_excel"):
+            self._save_to_excel(merge_rotate_group, output_path)
 
 
     def _merge_images_and_tags(self, img_group):
         # 이슈 와 태그 정보 병합
         merge_img_and_tag_group = {}
+        tag_index = self.db_client.get_tag_index({obj.tag_code for v in img_group.values() for obj in v})
         for k, v in img_group.items():
             if not v:
                 continue
             for obj in v:
-                tag = self.db_client.get_tag_by_tag_code(obj.tag_code)
+                tag = tag_index.get(obj.tag_code)
                 tag_info = self._get_tag_info(obj, tag)
                 merge_img_and_tag_group.setdefault(k, []).append(tag_info)
         return merge_img_and_tag_group
@@ -95,13 +113,14 @@ class DataHandlingService:
         # 이슈와 회전된 이슈 정보 병합
         # [obj.issue_code, obj.issue_created_at, obj.rotate, obj.package_link, tag.tag_name, tag.link_barcode]
         merge_rotate_group = {}
+        rotations = self.db_client.get_all_sample_data_by_package_link_in(
+            {obj[0] for v in merge_img_and_tag_group.values() for obj in v}
+        )
         for k, v in merge_img_and_tag_group.items():
             for obj in v:
                 temp = {obj[0]: {0: obj}}
-                package_link_sample = self.db_client.get_all_sample_date_by_package_link(obj[0])
-                for sample in package_link_sample:
-                    if obj[0] == sample.package_link:
-                        temp[obj[0]][sample.rotate] = list(sample) + [obj[4], obj[5]]
+                for rotate, sample in rotations.get(obj[0], {}).items():
+                    temp[obj[0]][rotate] = list(sample) + [obj[4], obj[5]]
                 merge_rotate_group.setdefault(k, []).append(temp)
         return merge_rotate_group
 
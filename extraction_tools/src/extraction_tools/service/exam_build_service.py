@@ -1,18 +1,23 @@
 from datetime import datetime
-from typing import Sequence
+from itertools import islice
+from typing import Sequence, Iterator, Iterable
 
+from sqlalchemy import update, case
 from sqlmodel import Session
 
 from extraction_tools.dto.Vo import ExamPaperVo
 from src.extraction_tools.dto.Vo import QuestionVo, QuestionDataVo, LanguageVo, DifficultyVo, OptionVo, ExamDataVo
 from src.extraction_tools.infra.orm import ORM
 from src.extraction_tools.infra.schema import Question, Option, Language, QuestionData, OptionData, CategoryEnum, \
-    DifficultyEnum
+    DifficultyEnum, Difficulty
+from src.extraction_tools.util.metrics import METRICS
 
 
 class ExamBuildService:
     def __init__(self, db_client: ORM):
         self.db_client = db_client
+        # 병합 중 재사용할 Language { kr: seq } (merge_exam_data 의 batch 마다 batch 의 텍스트만 대상 DB 에서 채운다)
+        self.language_seqs: dict[str, int] = {}
 
     def correct_answer_mapper(self, answer: int, options: Sequence[Option]):
         for option in options:
@@ -59,30 +64,59 @@ class ExamBuildService:
             )
         return result
 
+    def question_mapper(self, obj: Question) -> QuestionVo:
+        return QuestionVo(
+            title=LanguageVo(
+                name=obj.title.kr if obj.title else None
+            ),
+            category=obj.category,
+            template=obj.template,
+            difficulty=DifficultyVo(
+                name=obj.difficulty.name
+            ),
+            correct_answer=self.correct_answer_mapper(obj.correct_answer_seq, obj.options),
+            solution=LanguageVo(
+                name=obj.solution.kr
+            ),
+            question_data=self.question_data_mapper(obj.questions_data),
+            options=self.option_mapper(obj.options)
+        )
+
+    def iter_exam_data(self, batch_size: int = 500) -> Iterator[QuestionVo]:
+        # 문제를 batch_size 개씩 불러오면서 QuestionVo 로 변환
+        with self.db_client.unit_of_work(commit=False) as session:
+            for obj in self.db_client.iter_all_question_by_type(session, batch_size=batch_size):
+                yield self.question_mapper(obj)
+
     def extract_exam_data(self):
-        result = []
-        with Session(self.db_client._engine) as session:
-            questions: Sequence[Question] = self.db_client.get_all_question_by_type(session)
-            for obj in questions:
-                result.append(
-                    QuestionVo(
-                        title=LanguageVo(
-                            name=obj.title.kr if obj.title else None
-                        ),
-                        category=obj.category,
-                        template=obj.template,
-                        difficulty=DifficultyVo(
-                            name=obj.difficulty.name
-                        ),
-                        correct_answer=self.correct_answer_mapper(obj.correct_answer_seq, obj.options),
-                        solution=LanguageVo(
-                            name=obj.solution.kr
-                        ),
-                        question_data=self.question_data_mapper(obj.questions_data),
-                        options=self.option_mapper(obj.options)
-                    )
-                )
-        return ExamDataVo(questions=result)
+        return ExamDataVo(questions=list(self.iter_exam_data()))
+
+    def export_exam_data(self, path: str, batch_size: int = 500) -> int:
+        """
+        시험 데이터를 한 줄에 QuestionVo 하나씩 (NDJSON) 저장한다
+        @return: 저장한 문제 수
+        """
+        count = 0
+        with open(path, "w", encoding="utf-8") as f, METRICS.timer("stage_seconds", stage="export_exam_data"):
+            for question in self.iter_exam_data(batch_size):
+                f.write(question.model_dump_json())
+                f.write("\n")
+                count += 1
+        return count
+
+    @staticmethod
+    def load_exam_data(path: str) -> Iterator[QuestionVo]:
+        # export_exam_data 로 저장한 파일을 한 줄씩 읽는다
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield QuestionVo.model_validate_json(line)
+
+    @staticmethod
+    def batched(iterable: Iterable, batch_size: int) -> Iterator[list]:
+        iterator = iter(iterable)
+        while batch := list(islice(iterator, batch_size)):
+            yield batch
 
     def make_question_data(self, session, question_seq, question_data: list[QuestionDataVo]):
         for data in question_data:
@@ -94,24 +128,20 @@ class ExamBuildService:
                 created_at=datetime.now()
             )
             session.add(q_d)
-        session.commit()
+        # commit 은 merge_exam_data 의 unit_of_work 에서 batch 마다
+        session.flush()
 
 
     def make_option(self, session, question_seq: int, correct_answer: OptionVo, options: list[OptionVo]):
         result = None
         for option in options:
-            included_text = None
+            included_text_seq = None
             if option.include_text.name:
-                included_text = Language(kr=option.include_text.name,
-                                         en='translation do not exist',
-                                         created_at=datetime.now()
-                                         ) if option.include_text else None
-                session.add(included_text)
-                session.flush()
+                included_text_seq = self.intern_language(session, option.include_text.name)
 
             option_obj = Option(
                 question_seq=question_seq,
-                included_text=included_text,
+                included_text_seq=included_text_seq,
                 created_at=datetime.now()
             )
             session.add(option_obj)
@@ -126,53 +156,172 @@ class ExamBuildService:
                 )
                 session.add(option_data)
                 session.flush()
-            if correct_answer.include_text.name == option.include_text.name:
-                if not option_data:
-                    result = option_obj.seq
-                else:
-                    if correct_answer.option_data.image_id == option_data.image_id:
-                        result = option_obj.seq
+            if self.is_correct_answer(correct_answer, option):
+                result = option_obj.seq
         return result
 
-    def merge_exam_data(self, exam_data: ExamDataVo):
-        # 시험 데이터 병합
-        with Session(self.db_client._engine) as session:
-            for data in exam_data.questions:
-                title = None
-                if data.title.name:
-                    title = Language(kr=data.title.name,
-                                     en='translation do not exist',
-                                     created_at=datetime.now()
-                                     )
-                    session.add(title)
-                    session.flush()
-                solution = Language(kr=data.solution.name,
-                                    en='translation do not exist',
-                                    created_at=datetime.now()
-                                    ) if data.solution else None
-                session.add(solution)
-                session.flush()
+    @staticmethod
+    def is_correct_answer(correct_answer: OptionVo, option: OptionVo) -> bool:
+        # 텍스트가 같고, 이미지가 있다면 이미지도 같은 옵션
+        if correct_answer.include_text.name != option.include_text.name:
+            return False
+        if not option.option_data:
+            return True
+        return correct_answer.option_data is not None \
+            and correct_answer.option_data.image_id == option.option_data.image_id
 
-                difficulty = self.db_client.get_difficulty_by_name(session, data.difficulty.name)
-                question = Question(
-                    title=title,
-                    category=data.category,
-                    template=data.template,
-                    difficulty=difficulty,
-                    solution=solution,
-                    correct_answer_seq=1,
-                    created_at=datetime.now()
+    def merge_exam_data(self, exam_data: ExamDataVo | Iterable[QuestionVo], batch_size: int = 500,
+                        bulk: bool = False):
+        """
+        시험 데이터 병합
+        @param exam_data: ExamDataVo 또는 QuestionVo iterable (load_exam_data)
+        @param batch_size: 한 트랜잭션에서 병합할 문제 수
+        @param bulk: True 이면 batch 단위로 테이블별 일괄 insert (bulk_merge_questions)
+        """
+        questions = exam_data.questions if isinstance(exam_data, ExamDataVo) else exam_data
+        self.db_client.get_reference_rows(Difficulty)
+        for batch in self.batched(questions, batch_size):
+            # batch 마다 commit (실패하면 해당 batch 만 rollback)
+            with self.db_client.unit_of_work() as session, \
+                    METRICS.timer("stage_seconds", stage="merge_exam_data.batch"):
+                # 메모리 사용량이 batch 크기만큼으로 일정하도록 batch 의 텍스트만 조회한다
+                self.language_seqs = self.db_client.get_language_seq_by_kr_in(self.batch_texts(batch))
+                if bulk:
+                    self.bulk_merge_questions(session, batch)
+                else:
+                    for data in batch:
+                        self.merge_question(session, data)
+                # raise Exception("just Test")
+
+    @staticmethod
+    def batch_texts(batch: list[QuestionVo]) -> set[str]:
+        # batch 의 제목, 해설, 옵션 텍스트
+        texts = set()
+        for data in batch:
+            if data.title and data.title.name:
+                texts.add(data.title.name)
+            if data.solution and data.solution.name:
+                texts.add(data.solution.name)
+            texts.update(option.include_text.name for option in data.options if option.include_text.name)
+        return texts
+
+    def bulk_merge_questions(self, session: Session, batch: list[QuestionVo]):
+        """
+        문제 batch 를 테이블별로 모아서 한번에 insert 한다
+            language -> question -> question_data, option -> option_data 순서로 insert
+            생성된 기본키는 테이블마다 한번에 받아서 다음 테이블의 외래키로 사용한다
+            마지막으로 정답 옵션 (correct_answer_seq) 을 UPDATE 1회로 반영한다
+        """
+        now = datetime.now()
+        title_texts = [data.title.name or None for data in batch]
+        solution_texts = [data.solution.name for data in batch]
+        option_texts = [[option.include_text.name or None for option in data.options] for data in batch]
+        self.intern_languages(session, [*title_texts, *solution_texts, *(text for texts in option_texts for text in texts)])
+
+        def language_seq(text: str | None) -> int | None:
+            return self.language_seqs[text] if text is not None else None
+
+        question_seqs = self.db_client.bulk_insert(session, Question, [
+            {
+                "title_seq": language_seq(title_text),
+                "category": data.category,
+                "template": data.template,
+                "difficulty_seq": self.db_client.get_difficulty_seq(data.difficulty.name),
+                "solution_seq": language_seq(solution_text),
+                "correct_answer_seq": None,
+                "created_at": now
+            }
+            for data, title_text, solution_text in zip(batch, title_texts, solution_texts)
+        ])
+
+        self.db_client.bulk_insert(session, QuestionData, [
+            {
+                "question_seq": question_seq,
+                "image_id": question_data.image_id,
+                "filter": question_data.filter_name,
+                "is_main_image": question_data.is_main_image,
+                "created_at": now
+            }
+            for data, question_seq in zip(batch, question_seqs)
+            for question_data in data.question_data
+        ], return_keys=False)
+
+        option_seqs = self.db_client.bulk_insert(session, Option, [
+            {"question_seq": question_seq, "included_text_seq": language_seq(text), "created_at": now}
+            for question_seq, texts in zip(question_seqs, option_texts)
+            for text in texts
+        ])
+        options = [(question_seq, option) for data, question_seq in zip(batch, question_seqs) for option in data.options]
+        self.db_client.bulk_insert(session, OptionData, [
+            {
+                "option_seq": option_seq,
+                "image_id": option.option_data.image_id,
+                "filter": option.option_data.filter_name,
+                "created_at": now
+            }
+            for option_seq, (_, option) in zip(option_seqs, options)
+            if option.option_data
+        ], return_keys=False)
+
+        # 정답 옵션이 여러개라면 make_option 과 같이 마지막 옵션
+        correct_answers = {}
+        correct_answer_by_question = {question_seq: data.correct_answer for data, question_seq in zip(batch, question_seqs)}
+        for option_seq, (question_seq, option) in zip(option_seqs, options):
+            if self.is_correct_answer(correct_answer_by_question[question_seq], option):
+                correct_answers[question_seq] = option_seq
+        if correct_answers:
+            session.exec(
+                update(Question.__table__).where(
+                    Question.__table__.c.seq.in_(correct_answers)
+                ).values(
+                    correct_answer_seq=case(correct_answers, value=Question.__table__.c.seq)
                 )
-                session.add(question)
-                session.flush()
-                if data.question_data:
-                    self.make_question_data(session, question.seq, data.question_data)
-                correct_answer = self.make_option(session, question.seq, data.correct_answer, data.options)
-                question.correct_answer_seq = correct_answer
-                session.add(question)
-                session.flush()
-            # raise Exception("just Test")
-            session.commit()
+            )
+
+    def intern_language(self, session: Session, text: str) -> int:
+        # 같은 kr 의 Language 가 있다면 재사용, 없다면 새로 만든다
+        if text not in self.language_seqs:
+            language = Language(kr=text,
+                                en='translation do not exist',
+                                created_at=datetime.now()
+                                )
+            session.add(language)
+            session.flush()
+            self.language_seqs[text] = language.seq
+        return self.language_seqs[text]
+
+    def intern_languages(self, session: Session, texts: Iterable[str | None]):
+        # intern_language 의 일괄 처리 버전 (없는 kr 만 한번에 insert)
+        now = datetime.now()
+        new_texts = [text for text in dict.fromkeys(texts) if text is not None and text not in self.language_seqs]
+        seqs = self.db_client.bulk_insert(session, Language, [
+            {"kr": text, "en": 'translation do not exist', "created_at": now} for text in new_texts
+        ])
+        self.language_seqs.update(zip(new_texts, seqs))
+
+    def merge_question(self, session: Session, data: QuestionVo):
+        title_seq = None
+        if data.title.name:
+            title_seq = self.intern_language(session, data.title.name)
+        solution_seq = self.intern_language(session, data.solution.name) if data.solution else None
+
+        question = Question(
+            title_seq=title_seq,
+            category=data.category,
+            template=data.template,
+            difficulty_seq=self.db_client.get_difficulty_seq(data.difficulty.name),
+            solution_seq=solution_seq,
+            correct_answer_seq=1,
+            created_at=datetime.now()
+        )
+        session.add(question)
+        session.flush()
+        if data.question_data:
+            self.make_question_data(session, question.seq, data.question_data)
+        correct_answer = self.make_option(session, question.seq, data.correct_answer, data.options)
+        question.correct_answer_seq = correct_answer
+        session.add(question)
+        session.flush()
 
     def clean_exam_data(self):
         pass
@@ -186,12 +335,12 @@ class ExamBuildService:
 
     def update_exam_paper(self, exam_category: ExamPaperVo, obj: Question):
         category: ExamPaperVo.QuestionPaperVo = exam_category.__dict__[obj.category.name]
-        match obj.difficulty_seq:
-            case 1:
+        match self.db_client.get_difficulty_name(obj.difficulty_seq):
+            case DifficultyEnum.상:
                 category.high_count += 1
-            case 2:
+            case DifficultyEnum.중:
                 category.middle_count += 1
-            case 3:
+            case DifficultyEnum.하:
                 category.low_count += 1
         category.question.append(obj)
 
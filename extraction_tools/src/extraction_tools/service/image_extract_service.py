@@ -1,43 +1,83 @@
-import asyncio
-from typing import Sequence, Coroutine
+from collections.abc import Sequence
+
+from sqlalchemy import Row
 
 from src.extraction_tools.client.ssh_client import SSHClient
+from src.extraction_tools.dto.Vo import RemoteFileVo
+from src.extraction_tools.infra.async_orm import AsyncORM
 from src.extraction_tools.infra.orm import ORM
-from src.extraction_tools.infra.schema import Option, QuestionData
 from src.extraction_tools.util.directory_util import DirectoryUtil
+from src.extraction_tools.util.pipeline import Pipeline, Stage
 
 
 class ImageExtractService:
-    def __init__(self, db_client: ORM, directory_util: DirectoryUtil, ssh_client: SSHClient):
+    def __init__(self, db_client: ORM | AsyncORM, directory_util: DirectoryUtil, ssh_client: SSHClient,
+                 partition_size: int = 1000, queue_size: int = 1000):
+        """
+        db_client: AsyncORM 이면 조회 결과를 이벤트 루프에서 바로 선별 단계로 넘긴다 (ORM 은 작업 스레드에서 조회)
+        partition_size: DB 에서 한번에 이미지를 읽는 문제 수
+        queue_size: 단계 사이 큐에 쌓아둘 수 있는 항목 수 (메모리 사용량 상한)
+        """
         self.db_client = db_client
         self.directory_util = directory_util
         self.ssh_client = ssh_client
+        self.partition_size = partition_size
+        self.queue_size = queue_size
 
     async def extract_target_questions_and_option_images(self, download_path: str, upload_path: str):
-        coroutines: list[Coroutine] = []
-        target_question_seq = self.db_client.get_all_question_seq()
-        for question_seq in target_question_seq:
-            questions_image: Sequence[QuestionData.image_id] = self.db_client.get_question_data_img_id_by_question_seq(
-                question_seq)
-            if not questions_image:
-                continue
-            options_image: Sequence[str] = self.db_client.get_all_option_data_img_id_by_question_seq(question_seq)
-            if not options_image:
-                continue
-            for question_image in questions_image:
-                coroutines.append(
-                    self.ssh_client.folder_download(
-                        remote_path=f"{download_path}",
-                        local_path=f"{upload_path}",
-                        img_id=question_image)
-                )
-            for option_image in options_image:
-                if option_image.endswith("Chip"):
-                    continue
-                coroutines.append(
-                    self.ssh_client.folder_download(
-                        remote_path=f"{download_path}",
-                        local_path=f"{upload_path}",
-                        img_id=option_image)
-                )
-        await asyncio.gather(*coroutines)
+        """
+        문제 이미지, 옵션 이미지가 모두 있는 문제의 이미지만 다운로드 (같은 이미지는 1회)
+        DB 조회 -> 대상 선별 -> 원격 목록 조회 -> 전송 을 단계별로 동시에 진행한다
+        """
+        # question_seq 순서로 조회되므로, 문제가 바뀔 때 직전 문제의 이미지를 확정한다
+        current: dict = {"seq": None, "question": [], "option": []}
+        seen: set[str] = set()
+
+        def flush() -> list[str]:
+            img_ids = []
+            if current["question"] and current["option"]:
+                option_ids = [image_id for image_id in current["option"] if not image_id.endswith("Chip")]
+                for image_id in current["question"] + option_ids:
+                    if image_id not in seen:
+                        seen.add(image_id)
+                        img_ids.append(image_id)
+            current["question"], current["option"] = [], []
+            return img_ids
+
+        async def select_images(rows: Sequence[Row] | None) -> list[str]:
+            if rows is None:
+                return flush()
+            img_ids = []
+            for row in rows:
+                if row.question_seq != current["seq"]:
+                    img_ids.extend(flush())
+                    current["seq"] = row.question_seq
+                current[row.source].append(row.image_id)
+            return img_ids
+
+        async def list_files(img_ids: list[str]) -> list[tuple[RemoteFileVo, str]]:
+            return await self.ssh_client.list_download_targets(f"{download_path}", f"{upload_path}", img_ids)
+
+        async def transfer(target: tuple[RemoteFileVo, str]) -> list[tuple[RemoteFileVo, str]]:
+            file, local_path = target
+            if not await self.ssh_client.download(file.path, local_path, file.size, file.mtime):
+                print(f"Failed to download {file.path}")
+                return []
+            return [target]
+
+        # 마지막 문제를 확정하기 위해 조회가 끝나면 None 을 넘긴다
+        def rows():
+            yield from self.db_client.iter_all_question_and_option_img_id(self.partition_size)
+            yield None
+
+        async def async_rows():
+            async for partition in self.db_client.iter_all_question_and_option_img_id(self.partition_size):
+                yield partition
+            yield None
+
+        source = async_rows() if isinstance(self.db_client, AsyncORM) else rows()
+        await Pipeline(source, [
+            Stage("select", select_images, queue_size=4),
+            Stage("list", list_files, workers=2, batch_size=200, queue_size=self.queue_size),
+            Stage("transfer", transfer, workers=self.ssh_client.max_channels, queue_size=self.queue_size),
+        ], name="extract_target_questions_and_option_images").run()
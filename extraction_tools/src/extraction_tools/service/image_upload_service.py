@@ -1,66 +1,127 @@
-import asyncio
+import os
+from collections.abc import AsyncIterable, Iterable
 from datetime import date
 
 from src.extraction_tools.client.ssh_client import SSHClient
-from src.extraction_tools.dto.Vo import IssueTagResult, IssueCodeNTime, IssueLinkTagCode
+from src.extraction_tools.dto.Record import IssueTagRecord, IssueCodeNTimeRecord
+from src.extraction_tools.infra.async_orm import AsyncORM
 from src.extraction_tools.infra.orm import ORM
 from src.extraction_tools.util.directory_util import DirectoryUtil
+from src.extraction_tools.util.pipeline import Pipeline, Stage
 
 
 class ImageUploadService:
-    def __init__(self, directory_util: DirectoryUtil, ssh_client: SSHClient, db_client: ORM):
+    def __init__(self, directory_util: DirectoryUtil, ssh_client: SSHClient, db_client: ORM | AsyncORM,
+                 partition_size: int = 1000, queue_size: int = 1000):
+        """
+        db_client: AsyncORM 이면 조회 결과를 이벤트 루프에서 바로 전송 큐로 넘긴다 (ORM 은 작업 스레드에서 조회)
+        partition_size: DB 에서 한번에 읽는 이슈 수
+        queue_size: 단계 사이 큐에 쌓아둘 수 있는 전송 대상 수 (메모리 사용량 상한)
+        """
         self.directory_util = directory_util
         self.ssh_client = ssh_client
         self.db_client = db_client
+        self.partition_size = partition_size
+        self.queue_size = queue_size
 
-    async def upload_all_sample_images(self, target_date: dict[str, list[date]], download_path: str, upload_path: str):
-        img_group: dict[date, list[IssueTagResult]] = self.db_client.get_image_group_by_date(
-            target_date,
-            self.db_client.get_sample_data_by_created_at_range
-        )
-        await self._validate_sample_images(img_group, download_path, upload_path)
-
-    async def _validate_sample_images(self, img_group: dict[date, list[IssueTagResult]], download_path: str, upload_path: str):
-        coroutines = []
-
-        for k, v in img_group.items():
-            if not v:
-                continue
-            self.directory_util.make_directory_if_not_exists(download_path)
-            for issue_tag_result in v:
+    async def upload_all_sample_images(self, target_date: dict[str, list[date]], download_path: str, upload_path: str,
+                                       use_tar: bool = True):
+        """
+        DB 조회 -> 전송 대상 생성 -> 존재 확인 -> 전송 -> 검증 을 단계별로 동시에 진행한다
+        use_tar: color.jpg 들을 tar 스트림으로 묶어서 받는다 (False 면 파일별 SFTP)
+        """
+        partitions: Iterable[list[IssueTagRecord]] | AsyncIterable[list[IssueTagRecord]] = \
+            self.db_client.iter_image_by_date(
+                target_date,
+                self.db_client.iter_sample_data_by_created_at_range,
+                self.partition_size,
+                compact=True
+            )
+        await self._validate_sample_images(partitions, download_path, upload_path, use_tar)
+
+    async def _validate_sample_images(self,
+                                      partitions: Iterable[list[IssueTagRecord]] | AsyncIterable[list[IssueTagRecord]],
+                                      download_path: str, upload_path: str, use_tar: bool = False):
+        self.directory_util.make_directory_if_not_exists(download_path)
+
+        async def plan(issues: list[IssueTagRecord]) -> list[tuple[str, str]]:
+            targets = []
+            for issue_tag_result in issues:
                 for position in "top", "side":
                     remote_path = f"{download_path}/{issue_tag_result.issue_code}/{position}/color.jpg"
                     local_path = (f"{upload_path}/{issue_tag_result.tag_code}_color"
                                   f"_{issue_tag_result.rotate}_{position}"
                                   f"_{issue_tag_result.issue_code}.jpg")
-                    if self.ssh_client.is_exist(remote_path):
-                        coroutines.append(self.ssh_client.download(remote_path, local_path))
-        await asyncio.gather(*coroutines)
+                    targets.append((remote_path, local_path))
+            return targets
+
+        stages = [Stage("plan", plan, queue_size=4)]
+        if use_tar:
+            # tar 는 없는 파일을 건너뛰므로 존재 확인이 필요 없다
+            stages.append(Stage("transfer", self._tar_transfer, workers=2, batch_size=500,
+                                queue_size=self.queue_size))
+        else:
+            stages.extend(self._sftp_stages())
+        stages.append(Stage("verify", self._verify, queue_size=self.queue_size))
+        await Pipeline(partitions, stages, name="upload_all_sample_images").run()
         print("Done")
 
     async def upload_all_package_images(self, target_date: dict[str, list[date]], download_path: str, upload_path: str):
-        img_group: dict[date, list[IssueCodeNTime]] = self.db_client.get_image_group_by_date(
-            target_date,
-            self.db_client.get_package_data_by_created_at_range
-        )
-        await self._validate_package_images(img_group, download_path, upload_path)
-
-    async def _validate_package_images(self, img_group: dict[date, list[IssueCodeNTime]], download_path: str, upload_path: str):
-        coroutines = []
-
-        for k, v in img_group.items():
-            if not v:
-                continue
-            year, month, day = k.year, k.month, k.day
-            self.directory_util.make_directory_if_not_exists(download_path)
-            for obj in v:
+        partitions: Iterable[list[IssueCodeNTimeRecord]] | AsyncIterable[list[IssueCodeNTimeRecord]] = \
+            self.db_client.iter_image_by_date(
+                target_date,
+                self.db_client.iter_package_data_by_created_at_range,
+                self.partition_size,
+                compact=True
+            )
+        await self._validate_package_images(partitions, download_path, upload_path)
+
+    async def _validate_package_images(self,
+                                       partitions: Iterable[list[IssueCodeNTimeRecord]] | AsyncIterable[list[IssueCodeNTimeRecord]],
+                                       download_path: str, upload_path: str):
+        self.directory_util.make_directory_if_not_exists(download_path)
+
+        async def plan(issues: list[IssueCodeNTimeRecord]) -> list[tuple[str, str]]:
+            targets = []
+            for obj in issues:
                 for position in "none", "none":
-                    if self.ssh_client.is_exist(download_path):
-                        coroutines.append(self.ssh_client.download(download_path, upload_path))
-
-        results = await asyncio.gather(*coroutines)
-        for result in results:
-            if not result:
-                print(f"Failed to download {result}")
-                continue
+                    targets.append((download_path, upload_path))
+            return targets
+
+        stages = [Stage("plan", plan, queue_size=4), *self._sftp_stages()]
+        await Pipeline(partitions, stages, name="upload_all_package_images").run()
         print("Done")
+
+    def _sftp_stages(self) -> list[Stage]:
+        # 존재 확인 (폴더별로 묶어서 1회) -> 파일별 SFTP 전송
+        return [
+            Stage("exists", self._filter_existing, workers=2, batch_size=200, queue_size=self.queue_size),
+            Stage("transfer", self._transfer, workers=self.ssh_client.max_channels, queue_size=self.queue_size),
+        ]
+
+    async def _filter_existing(self, targets: list[tuple[str, str]]) -> list[tuple[str, str, int, float]]:
+        # 원격지에 있는 파일만 (원격 경로, 로컬 경로, 크기, 수정 시간) 으로 넘긴다 (download 가 stat 을 다시 하지 않도록)
+        existing = await self.ssh_client.stat_many(remote_path for remote_path, _ in targets)
+        return [
+            (remote_path, local_path, existing[remote_path].size, existing[remote_path].mtime)
+            for remote_path, local_path in targets
+            if remote_path in existing
+        ]
+
+    async def _transfer(self, target: tuple[str, str, int, float]) -> list[tuple[str, str, int, float]]:
+        if not await self.ssh_client.download(*target):
+            print(f"Failed to download {target[0]}")
+            return []
+        return [target]
+
+    async def _tar_transfer(self, targets: list[tuple[str, str]]) -> list[tuple[str, str]]:
+        downloaded = await self.ssh_client.bulk_download(dict(targets), batch_size=len(targets))
+        return [target for target in targets if target[0] in downloaded]
+
+    @staticmethod
+    async def _verify(target: tuple[str, ...]) -> list[tuple[str, ...]]:
+        # 받은 파일이 비어있다면 알린다
+        if os.path.getsize(target[1]) == 0:
+            print(f"Empty file {target[1]}")
+            return []
+        return [target]
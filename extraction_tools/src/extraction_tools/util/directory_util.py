@@ -1,12 +1,10 @@
 import os
 import shutil
-from collections.abc import Callable
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 
 class DirectoryUtil:
-    def __init__(self):
-        self.target_container = set()
-
     def make_directory_if_not_exists(self, directory):
         if not os.path.exists(directory):
             os.makedirs(directory, exist_ok=True)
@@ -27,31 +25,55 @@ class DirectoryUtil:
         except Exception:
             print(f"Failed to remove {path}")
 
-    def _traverse_directory(self, in_path: str, condition_func: Callable):
-        if os.path.exists(in_path):
-            target_list = os.listdir(in_path)
-            for target in target_list:
-                full_path = os.path.join(in_path, target)
-                if full_path.__contains__(".DS_Store"):
+    def walk(self, in_path: str, condition_func: Callable[[os.DirEntry], bool], workers: int = 1) -> Iterator[str]:
+        """
+        in_path 하위를 scandir 로 탐색하며 condition_func 를 만족하는 경로를 반환한다 (generator)
+            조건을 만족한 폴더는 더 탐색하지 않는다
+            workers > 1 이면 하위 폴더를 스레드 풀에 나눠서 탐색한다 (반환 순서는 보장하지 않는다)
+        """
+        if not os.path.exists(in_path):
+            return
+        if workers <= 1:
+            stack = [in_path]
+            while stack:
+                matches, sub_dirs = self._scan_directory(stack.pop(), condition_func)
+                yield from matches
+                stack.extend(sub_dirs)
+            return
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = {executor.submit(self._scan_directory, in_path, condition_func)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    matches, sub_dirs = future.result()
+                    yield from matches
+                    pending |= {executor.submit(self._scan_directory, sub_dir, condition_func) for sub_dir in sub_dirs}
+
+    def _scan_directory(self, in_path: str, condition_func: Callable[[os.DirEntry], bool]) -> tuple[list[str], list[str]]:
+        # 폴더 하나를 탐색 -> (조건을 만족한 경로, 더 탐색할 하위 폴더)
+        matches, sub_dirs = [], []
+        with os.scandir(in_path) as entries:
+            for entry in entries:
+                if entry.name == ".DS_Store":
                     continue
-                if condition_func(full_path):
-                    self.target_container.add(full_path)
-                else:
-                    if os.path.isfile(full_path):  # not target file
-                        continue
-                    self._traverse_directory(full_path, condition_func)
-
-    def find_empty_file(self, in_path: str):
-        def condition_func(full_path):
-            return os.path.isfile(full_path) and os.path.getsize(full_path) == 0
-        self._traverse_directory(in_path, condition_func)
-
-    def find_target_file(self, in_path: str):
-        def condition_func(full_path):
-            return os.path.isfile(full_path)
-        self._traverse_directory(in_path, condition_func)
-
-    def find_download_ended_dir(self, in_path: str):
-        def condition_func(full_path):
-            return os.path.isdir(full_path) and "end" in os.listdir(full_path)
-        self._traverse_directory(in_path, condition_func)
+                if condition_func(entry):
+                    matches.append(entry.path)
+                elif entry.is_dir():
+                    sub_dirs.append(entry.path)
+        return matches, sub_dirs
+
+    def find_empty_file(self, in_path: str, workers: int = 1) -> Iterator[str]:
+        def condition_func(entry: os.DirEntry):
+            return entry.is_file() and entry.stat().st_size == 0
+        return self.walk(in_path, condition_func, workers)
+
+    def find_target_file(self, in_path: str, workers: int = 1) -> Iterator[str]:
+        def condition_func(entry: os.DirEntry):
+            return entry.is_file()
+        return self.walk(in_path, condition_func, workers)
+
+    def find_download_ended_dir(self, in_path: str, workers: int = 1) -> Iterator[str]:
+        def condition_func(entry: os.DirEntry):
+            return entry.is_dir() and os.path.exists(os.path.join(entry.path, "end"))
+        return self.walk(in_path, condition_func, workers)
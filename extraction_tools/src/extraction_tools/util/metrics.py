@@ -0,0 +1,238 @@
+import functools
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Prometheus 기본 구간 (초)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_THIS_FILE = os.path.abspath(__file__)
+
+
+class Histogram:
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        # [(le, 누적 개수)] (Prometheus _bucket)
+        result, total = [], 0
+        for le, count in zip([*map(str, self.buckets), "+Inf"], self.counts):
+            total += count
+            result.append((le, total))
+        return result
+
+
+class Metrics:
+    def __init__(self):
+        """
+        카운터와 히스토그램을 이름 + 라벨별로 모은다 (스레드 안전)
+            counter: 누적 값 (쿼리 수, 전송 byte)
+            histogram: 소요 시간 분포 (초)
+        dump_path: 있으면 report_metrics 가 끝날 때 파일로 저장한다 (.prom, .txt 는 Prometheus text, 그 외 JSON)
+                   "{name}" 이 있으면 process 이름으로 바꾼다
+        """
+        self.dump_path: str | None = None
+        self._counters: dict[tuple[str, tuple], float] = {}
+        self._histograms: dict[tuple[str, tuple], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def snapshot(self) -> dict:
+        """
+        @return: { "counters": [{name, labels, value}], "histograms": [{name, labels, count, sum, max, buckets}] }
+        """
+        with self._lock:
+            return {
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in sorted(self._counters.items())
+                ],
+                "histograms": [
+                    {
+                        "name": name, "labels": dict(labels), "count": histogram.count,
+                        "sum": round(histogram.sum, 6), "max": round(histogram.max, 6),
+                        "buckets": dict(histogram.cumulative())
+                    }
+                    for (name, labels), histogram in sorted(self._histograms.items())
+                ]
+            }
+
+    def to_json(self, **extra) -> str:
+        return json.dumps({**extra, **self.snapshot()}, ensure_ascii=False, indent=2)
+
+    def to_prometheus(self) -> str:
+        lines, typed = [], set()
+        snapshot = self.snapshot()
+        for counter in snapshot["counters"]:
+            if counter["name"] not in typed:
+                typed.add(counter["name"])
+                lines.append(f"# TYPE {counter['name']} counter")
+            lines.append(f"{counter['name']}{self._labels(counter['labels'])} {counter['value']}")
+        for histogram in snapshot["histograms"]:
+            name, labels = histogram["name"], histogram["labels"]
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} histogram")
+            for le, count in histogram["buckets"].items():
+                lines.append(f"{name}_bucket{self._labels({**labels, 'le': le})} {count}")
+            lines.append(f"{name}_sum{self._labels(labels)} {histogram['sum']}")
+            lines.append(f"{name}_count{self._labels(labels)} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _labels(labels: dict) -> str:
+        if not labels:
+            return ""
+        values = ",".join(f'{k}="{Metrics._escape(v)}"' for k, v in labels.items())
+        return f"{{{values}}}"
+
+    @staticmethod
+    def _escape(value) -> str:
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    def summary(self, title: str) -> str:
+        """
+        사람이 읽는 요약 (시간이 오래 걸린 순)
+            histogram: 횟수, 합계, 평균, 최대 (초)
+            counter: 값, *_bytes_total 은 같은 라벨의 sftp_operation_seconds 합계로 나눈 초당 전송량
+        """
+        snapshot = self.snapshot()
+        seconds = {
+            (histogram["name"], tuple(sorted(histogram["labels"].items()))): histogram["sum"]
+            for histogram in snapshot["histograms"]
+        }
+        lines = [f"[metrics] {title}"]
+        for histogram in sorted(snapshot["histograms"], key=lambda h: h["sum"], reverse=True):
+            average = histogram["sum"] / histogram["count"] if histogram["count"] else 0
+            lines.append(f"  {histogram['name']}{self._labels(histogram['labels'])}"
+                         f" count={histogram['count']} total={histogram['sum']:.3f}s"
+                         f" avg={average * 1000:.1f}ms max={histogram['max'] * 1000:.1f}ms")
+        for counter in snapshot["counters"]:
+            line = f"  {counter['name']}{self._labels(counter['labels'])} {counter['value']:g}"
+            if counter["name"].endswith("_bytes_total"):
+                elapsed = seconds.get(("sftp_operation_seconds", tuple(sorted(counter["labels"].items()))))
+                if elapsed:
+                    line += f" ({counter['value'] / elapsed / 2 ** 20:.2f} MiB/s)"
+            lines.append(line)
+        return "\n".join(lines)
+
+    def dump(self, path: str, name: str):
+        path = path.format(name=name)
+        with open(path, "w") as f:
+            if path.endswith((".prom", ".txt")):
+                f.write(self.to_prometheus())
+            else:
+                f.write(self.to_json(process=name))
+
+
+METRICS = Metrics()
+
+
+def report_metrics(func):
+    """
+    process_* 용 데코레이터
+        시작할 때 METRICS 를 비우고, 끝나면 요약을 출력한다 (METRICS.dump_path 가 있으면 파일로도 저장)
+    """
+    def emit():
+        print(METRICS.summary(func.__name__))
+        if METRICS.dump_path:
+            METRICS.dump(METRICS.dump_path, func.__name__)
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            METRICS.reset()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                emit()
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        METRICS.reset()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            emit()
+    return wrapper
+
+
+def _calling_method() -> str:
+    # 쿼리를 실행한 가장 가까운 public 함수 (패키지 내부, sqlalchemy 와 private 함수 제외) 예: ORM.get_tag_index
+    frame = sys._getframe(2)
+    while frame is not None:
+        code = frame.f_code
+        if code.co_filename.startswith(_PACKAGE_DIR) and code.co_filename != _THIS_FILE \
+                and not code.co_name.startswith(("_", "<")):
+            return code.co_qualname
+        frame = frame.f_back
+    return "<unknown>"
+
+
+def instrument_engine(engine: Engine, metrics: Metrics = METRICS):
+    """
+    engine 에서 실행되는 쿼리 수와 소요 시간을 호출한 함수별로 기록한다
+        sql_queries_total{method}, sql_query_seconds{method}
+    """
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_query", []).append((time.perf_counter(), _calling_method()))
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started, method = conn.info["metrics_query"].pop()
+        metrics.inc("sql_queries_total", method=method)
+        metrics.observe("sql_query_seconds", time.perf_counter() - started, method=method)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        # 실패한 쿼리는 after_cursor_execute 가 호출되지 않는다
+        queries = context.connection.info.get("metrics_query") if context.connection is not None else None
+        if queries:
+            started, method = queries.pop()
+            metrics.inc("sql_errors_total", method=method)
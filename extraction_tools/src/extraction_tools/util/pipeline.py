@@ -0,0 +1,111 @@
+import asyncio
+import time
+from collections.abc import AsyncIterable, Awaitable, Callable, Iterable
+
+from src.extraction_tools.util.metrics import METRICS
+
+_DONE = object()
+
+
+class Stage:
+    def __init__(self, name: str, func: Callable[..., Awaitable[Iterable | None]], workers: int = 1,
+                 batch_size: int | None = None, queue_size: int = 100):
+        """
+        name: 단계 이름 (오류 출력, stage_seconds 라벨에 사용)
+        func: 입력 1개 (batch_size 가 있으면 입력 목록) 를 받아 다음 단계로 넘길 항목들을 반환하는 코루틴 함수
+              None 을 반환하면 넘기지 않는다
+        workers: 이 단계를 동시에 처리하는 작업 수
+        batch_size: 있으면 큐에 쌓인 입력을 최대 batch_size 개씩 묶어서 넘긴다 (exists_many 처럼 묶어서 처리하는 경우)
+        queue_size: 이 단계 입력 큐의 최대 크기, 큐가 차면 앞 단계는 자리가 날 때까지 기다린다
+        """
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+
+
+class Pipeline:
+    def __init__(self, source: Iterable | AsyncIterable, stages: list[Stage], name: str = "pipeline"):
+        """
+        source 의 항목을 stages 순서대로 처리한다
+            단계 사이는 크기가 제한된 asyncio.Queue 로 연결되어, 뒤 단계가 밀리면 앞 단계도 멈춘다 (메모리 사용량 고정)
+            source 를 모두 읽기 전에 앞서 읽은 항목부터 다음 단계가 처리한다
+        source: 동기 iterable 이면 (DB 스트리밍 조회 등) 작업 스레드에서 하나씩 읽는다
+        name: 단계별 소요 시간 (stage_seconds{stage="name.단계"}) 을 기록할 이름, source 읽기는 "name.fetch"
+        """
+        self.source = source
+        self.stages = stages
+        self.name = name
+
+    async def run(self) -> int:
+        """
+        @return: 마지막 단계까지 처리된 항목 수
+        """
+        queues = [asyncio.Queue(maxsize=stage.queue_size) for stage in self.stages]
+        counter = [0]
+        async with asyncio.TaskGroup() as group:
+            group.create_task(self._produce(queues[0], self.stages[0].workers))
+            for i, stage in enumerate(self.stages):
+                if i + 1 < len(self.stages):
+                    output, next_workers = queues[i + 1], self.stages[i + 1].workers
+                else:
+                    output, next_workers = None, 0
+                group.create_task(self._run_stage(stage, queues[i], output, next_workers, counter))
+        return counter[0]
+
+    async def _produce(self, output: asyncio.Queue, next_workers: int):
+        if isinstance(self.source, AsyncIterable):
+            async for item in self.source:
+                await output.put(item)
+        else:
+            loop = asyncio.get_running_loop()
+            iterator = iter(self.source)
+            while True:
+                started = time.perf_counter()
+                item = await loop.run_in_executor(None, next, iterator, _DONE)
+                if item is _DONE:
+                    break
+                METRICS.observe("stage_seconds", time.perf_counter() - started, stage=f"{self.name}.fetch")
+                await output.put(item)
+        for _ in range(next_workers):
+            await output.put(_DONE)
+
+    async def _run_stage(self, stage: Stage, input_queue: asyncio.Queue, output: asyncio.Queue | None,
+                         next_workers: int, counter: list[int]):
+        # 작업이 모두 끝나면 다음 단계 작업 수만큼 종료 신호를 넘긴다
+        async with asyncio.TaskGroup() as group:
+            for _ in range(stage.workers):
+                group.create_task(self._work(stage, input_queue, output, counter))
+        for _ in range(next_workers):
+            await output.put(_DONE)
+
+    async def _work(self, stage: Stage, input_queue: asyncio.Queue, output: asyncio.Queue | None,
+                    counter: list[int]):
+        done = False
+        while not done:
+            item = await input_queue.get()
+            if item is _DONE:
+                return
+            if stage.batch_size:
+                item = [item]
+                while len(item) < stage.batch_size and not input_queue.empty():
+                    next_item = input_queue.get_nowait()
+                    if next_item is _DONE:
+                        done = True
+                        break
+                    item.append(next_item)
+            try:
+                with METRICS.timer("stage_seconds", stage=f"{self.name}.{stage.name}"):
+                    results = await stage.func(item)
+            except Exception as e:
+                # 실패한 항목은 건너뛰고 다음 항목을 처리한다 (stage_errors_total 로 센다)
+                METRICS.inc("stage_errors_total", stage=f"{self.name}.{stage.name}")
+                print(f"Failed to process {stage.name}")
+                print(f"reason {e}")
+                continue
+            for result in results or ():
+                if output is None:
+                    counter[0] += 1
+                    continue
+                await output.put(result)
@@ -0,0 +1,192 @@
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Hashable
+
+
+class TTLCache:
+    def __init__(self, max_size: int = 1024, ttl: float | None = 60.0):
+        """
+        max_size: 최대 보관 개수, 넘치면 가장 오래 사용되지 않은 항목부터 제거 (LRU)
+        ttl: 보관 시간 (초), None 이면 만료되지 않는다
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._items: OrderedDict[Hashable, tuple[float, object]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default=None):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or (self.ttl is not None and time.monotonic() - item[0] > self.ttl):
+                self._items.pop(key, None)
+                self.misses += 1
+                return default
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key: Hashable, value: object):
+        with self._lock:
+            self._items[key] = (time.monotonic(), value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def invalidate(self, key: Hashable = None):
+        # key 가 없으면 전체 삭제
+        with self._lock:
+            if key is None:
+                self._items.clear()
+            else:
+                self._items.pop(key, None)
+
+    def __len__(self):
+        return len(self._items)
+
+
+class DiskTTLCache:
+    def __init__(self, path: str, namespace: str = "", max_size: int = 1024, ttl: float | None = 60.0,
+                 commit_interval: int = 100):
+        """
+        TTLCache 의 SQLite 버전 (프로세스가 끝나도 남아서 다음 실행에서도 사용한다)
+        path: 캐시 파일 경로, 여러 namespace 가 같은 파일을 나눠 쓸 수 있다
+        namespace: 같은 파일 안에서 항목을 구분할 이름
+        max_size, ttl: TTLCache 와 같다 (ttl 은 실행 간에도 유지되도록 실제 시각 기준)
+            max_size 를 넘으면 가장 오래 사용되지 않은 항목부터 max_size 의 1/10 만큼 한번에 제거한다
+        commit_interval: 쓰기 n 건마다 커밋 (close 에서도 커밋), 조회로 바뀐 사용 시각도 n 건씩 모아서 반영한다
+        값은 pickle 로 저장하고, key 는 repr 로 구분한다
+        """
+        self.namespace = namespace
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._commit_interval = commit_interval
+        self._pending = 0
+        # 아직 반영하지 않은 사용 시각 { repr(key): used_at }
+        self._used: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cache (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                stored_at REAL NOT NULL,
+                used_at REAL NOT NULL,
+                value BLOB NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_used_at ON cache (namespace, used_at)")
+        self._conn.commit()
+        # 저장된 항목 수 (같은 key 를 다시 저장하면 실제보다 커지므로, 넘치면 다시 센다)
+        self._size = self._count()
+
+    def get(self, key: Hashable, default=None):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT stored_at, value FROM cache WHERE namespace = ? AND key = ?",
+                (self.namespace, repr(key))
+            ).fetchone()
+            now = time.time()
+            if row is None or (self.ttl is not None and now - row[0] > self.ttl):
+                if row is not None:
+                    self._conn.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, repr(key)))
+                    self._used.pop(repr(key), None)
+                    self._size -= 1
+                    self._written()
+                self.misses += 1
+                return default
+            self._used[repr(key)] = now
+            if len(self._used) >= self._commit_interval:
+                self._flush_used()
+            self.hits += 1
+        return pickle.loads(row[1])
+
+    def set(self, key: Hashable, value: object):
+        try:
+            data = pickle.dumps(value)
+        except Exception as e:
+            # 저장할 수 없는 값 (세션에 연결된 객체 등) 은 캐시하지 않는다
+            print(f"Failed to cache {self.namespace} {key!r}")
+            print(f"reason {e}")
+            return
+        now = time.time()
+        with self._lock:
+            self._used.pop(repr(key), None)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, stored_at, used_at, value) VALUES (?, ?, ?, ?, ?)",
+                (self.namespace, repr(key), now, now, data)
+            )
+            self._size += 1
+            if self._size > self.max_size:
+                self._evict()
+            self._written()
+
+    def _evict(self):
+        # 가장 오래 사용되지 않은 항목부터 제거 (LRU), 순서가 맞도록 모아둔 사용 시각을 먼저 반영한다
+        self._flush_used()
+        self._size = self._count()
+        keep = self.max_size - self.max_size // 10
+        if self._size <= self.max_size:
+            return
+        self._conn.execute(
+            """
+            DELETE FROM cache WHERE namespace = ? AND key IN (
+                SELECT key FROM cache WHERE namespace = ? ORDER BY used_at LIMIT ?
+            )
+            """,
+            (self.namespace, self.namespace, self._size - keep)
+        )
+        self._size = keep
+
+    def _flush_used(self):
+        if not self._used:
+            return
+        self._conn.executemany(
+            "UPDATE cache SET used_at = ? WHERE namespace = ? AND key = ?",
+            [(used_at, self.namespace, key) for key, used_at in self._used.items()]
+        )
+        self._used.clear()
+        self._written()
+
+    def _written(self):
+        self._pending += 1
+        if self._pending >= self._commit_interval:
+            self._conn.commit()
+            self._pending = 0
+
+    def _count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM cache WHERE namespace = ?", (self.namespace,)).fetchone()[0]
+
+    def invalidate(self, key: Hashable = None):
+        # key 가 없으면 namespace 전체 삭제 (다른 프로세스에도 바로 보이도록 커밋)
+        with self._lock:
+            if key is None:
+                self._conn.execute("DELETE FROM cache WHERE namespace = ?", (self.namespace,))
+                self._used.clear()
+            else:
+                self._conn.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, repr(key)))
+                self._used.pop(repr(key), None)
+            self._conn.commit()
+            self._pending = 0
+            self._size = self._count()
+
+    def close(self):
+        with self._lock:
+            self._flush_used()
+            self._conn.commit()
+            self._conn.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._count()
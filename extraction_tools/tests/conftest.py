@@ -0,0 +1,40 @@
+import pytest
+
+from benchmarks.fixtures import make_sqlite_orm
+from benchmarks.sftp_server import LocalSFTPServer
+from src.extraction_tools.client.ssh_client import SSHClient
+
+
+@pytest.fixture
+def remote_root(tmp_path):
+    # 원격지의 "/" 로 사용할 폴더 (원격 경로는 이 폴더 기준 상대 경로로 사용한다)
+    root = tmp_path / "remote"
+    root.mkdir()
+    return root
+
+
+@pytest.fixture
+def sftp_server(remote_root):
+    with LocalSFTPServer(str(remote_root)) as server:
+        yield server
+
+
+@pytest.fixture
+def ssh_client_factory(sftp_server):
+    clients = []
+
+    def factory(**kwargs) -> SSHClient:
+        client = SSHClient("127.0.0.1", "test", "test", port=sftp_server.port, **kwargs)
+        clients.append(client)
+        return client
+
+    yield factory
+    for client in clients:
+        client.close()
+
+
+@pytest.fixture
+def sqlite_orm(tmp_path):
+    orm = make_sqlite_orm(str(tmp_path / "test.db"))
+    yield orm
+    orm._engine.dispose()
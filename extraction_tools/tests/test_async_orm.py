@@ -0,0 +1,121 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from benchmarks.fixtures import seed_issues, seed_exam, generate_sample_tree, generate_exam_tree
+from src.extraction_tools.infra.async_orm import AsyncORM
+from src.extraction_tools.service.image_extract_service import ImageExtractService
+from src.extraction_tools.service.image_upload_service import ImageUploadService
+from src.extraction_tools.util.date_util import DateUtil
+from src.extraction_tools.util.directory_util import DirectoryUtil
+
+START = datetime(2024, 1, 1)
+
+
+@pytest.fixture
+def seeded_orm(sqlite_orm):
+    samples = seed_issues(sqlite_orm, 30, START, tags=5)
+    image_ids = seed_exam(sqlite_orm, questions=10)
+    return sqlite_orm, samples, image_ids
+
+
+@pytest.fixture
+def async_orm(seeded_orm):
+    orm = AsyncORM("", "", "", 0, "", url=str(seeded_orm[0]._engine.url).replace("sqlite://", "sqlite+aiosqlite://"))
+    yield orm
+    asyncio.run(orm.dispose())
+
+
+@pytest.fixture
+def streamed(seeded_orm, async_orm) -> list[str]:
+    # 서버 사이드 커서 (yield_per, stream_results) 로 실행된 쿼리
+    # 전송이 밀려 읽기가 멈추는 동안 커서가 열려 있으면 MySQL 이 connection 을 끊는다 (net_write_timeout)
+    statements = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        if context.execution_options.get("stream_results"):
+            statements.append(statement)
+
+    for engine in seeded_orm[0]._engine, async_orm._engine.sync_engine:
+        event.listen(engine, "before_cursor_execute", on_execute)
+    return statements
+
+
+async def _collect(iterator) -> list:
+    return [item async for item in iterator]
+
+
+def test_async_queries_match_orm(seeded_orm, async_orm):
+    orm, samples, _ = seeded_orm
+    end = START + timedelta(hours=30)
+
+    async def run():
+        return (
+            await async_orm.get_sample_data_by_created_at_range(START, end, compact=True),
+            await _collect(async_orm.iter_sample_data_by_created_at_range(START, end, 7, compact=True)),
+            await async_orm.get_all_sample_data_by_package_link_in({"I1", "I2"}),
+            await async_orm.get_tag_index({"T1", "B2"}, chunk_size=1),
+            await async_orm.get_barcode_by_issue_code("I3"),
+            await _collect(async_orm.iter_all_question_and_option_img_id(5)),
+        )
+
+    sample, sample_partitions, rotations, tag_index, barcode, img_ids = asyncio.run(run())
+
+    assert sample == orm.get_sample_data_by_created_at_range(START, end, compact=True)
+    assert [issue for partition in sample_partitions for issue in partition] == sample
+    assert all(len(partition) <= 7 for partition in sample_partitions)
+    assert rotations == orm.get_all_sample_data_by_package_link_in({"I1", "I2"})
+    assert tag_index == orm.get_tag_index({"T1", "B2"})
+    assert barcode == orm.get_barcode_by_issue_code("I3") == "T3"
+    assert [row for partition in img_ids for row in partition] == \
+        [row for partition in orm.iter_all_question_and_option_img_id(5) for row in partition]
+
+
+def test_async_iter_image_by_date_matches_orm(seeded_orm, async_orm):
+    orm, _, _ = seeded_orm
+    target_date = DateUtil().search_all_date(START, START + timedelta(hours=30))
+
+    partitions = asyncio.run(_collect(async_orm.iter_image_by_date(
+        target_date, async_orm.iter_sample_data_by_created_at_range, 10, compact=True
+    )))
+
+    expected = orm.iter_image_by_date(target_date, orm.iter_sample_data_by_created_at_range, 10, compact=True)
+    assert partitions == list(expected)
+
+
+@pytest.mark.parametrize("use_async", [True, False])
+def test_upload_service_streams_from_orm(seeded_orm, async_orm, streamed, remote_root, ssh_client_factory, tmp_path,
+                                         monkeypatch, use_async):
+    orm, samples, _ = seeded_orm
+    files = generate_sample_tree(str(remote_root / "samples"), samples, file_size=64)
+    monkeypatch.chdir(tmp_path)
+    output = tmp_path / "output"
+    output.mkdir()
+    service = ImageUploadService(DirectoryUtil(), ssh_client_factory(), async_orm if use_async else orm,
+                                 partition_size=10)
+
+    target_date = DateUtil().search_all_date(START, START + timedelta(hours=30))
+    asyncio.run(service.upload_all_sample_images(target_date, "samples", str(output)))
+
+    assert len(list(output.iterdir())) == files
+    assert streamed == []
+
+
+def test_extract_service_streams_from_async_orm(seeded_orm, async_orm, streamed, remote_root, ssh_client_factory,
+                                                tmp_path):
+    orm, _, image_ids = seeded_orm
+    generate_exam_tree(str(remote_root / "exam_images"), image_ids, file_size=64)
+    outputs = {}
+    for name, db_client in ("orm", orm), ("async_orm", async_orm):
+        output = tmp_path / name
+        output.mkdir()
+        service = ImageExtractService(db_client, DirectoryUtil(), ssh_client_factory(), partition_size=3)
+        asyncio.run(service.extract_target_questions_and_option_images("exam_images/", f"{output}/"))
+        outputs[name] = sorted(str(path.relative_to(output)) for path in output.rglob("*.png"))
+
+    assert outputs["async_orm"] == outputs["orm"]
+    assert outputs["orm"]
+    assert not any("Chip" in path for path in outputs["orm"])
+    assert streamed == []
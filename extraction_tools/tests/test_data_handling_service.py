@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from benchmarks.fixtures import seed_issues
+from src.extraction_tools.service.data_handling_service import DataHandlingService
+from src.extraction_tools.util.date_util import DateUtil
+from src.extraction_tools.util.directory_util import DirectoryUtil
+
+START = datetime(2024, 1, 1)
+
+
+def test_find_missing_sample_writes_excel(sqlite_orm, tmp_path):
+    seed_issues(sqlite_orm, 12, START, tags=4)
+    output_path = tmp_path / "missing_sample.xlsx"
+    target_date = DateUtil().search_all_date(START, START + timedelta(hours=12))
+
+    DataHandlingService(DirectoryUtil(), sqlite_orm).find_missing_sample(target_date, str(output_path))
+
+    df = pd.read_excel(output_path, index_col=0, keep_default_na=False)
+    originals = df[~df["img_name"].str.contains("_")]
+    assert sorted(originals["img_name"]) == sorted(f"I{i}" for i in range(12))
+    assert set(originals["barcode_name"]) == {"T0", "T1", "T2", "T3"}
+    # 파일 확인 결과가 없는 칸은 "None"
+    assert set(df["0_top"]) == {"None"}
+
+
+def test_save_to_excel_reads_file_flags_and_missing_rotations(tmp_path):
+    created_at = datetime(2024, 1, 1, 9, 30)
+    row = ["I0", created_at, 0, "", "tag0", "T0"]
+    merge_rotate_group = {
+        created_at.date(): [
+            {"I0": {0: row + [True, False], 45: ["I0_45", created_at, 45, "I0", "tag0", "T0", False, True]}},
+            {"I1": {0: ["I1", created_at, 0, "", "tag1", "T1"]}},
+        ]
+    }
+    output_path = tmp_path / "result.xlsx"
+
+    DataHandlingService(DirectoryUtil(), None)._save_to_excel(merge_rotate_group, str(output_path))
+
+    records = pd.read_excel(output_path, index_col=0, keep_default_na=False).to_dict("records")
+    assert records[0]["0_top"] == True and records[0]["0_side"] == False
+    assert records[0]["45_top"] == False and records[0]["45_side"] == True
+    assert records[0]["90_top"] == "None"
+    assert records[1]["0_top"] == "None"
+    assert records[1]["created_date"] == "2024-01-01" and records[1]["created_time"] == "09:30:00"
@@ -0,0 +1,51 @@
+import pytest
+
+from src.extraction_tools.util.directory_util import DirectoryUtil
+
+
+@pytest.fixture
+def tree(tmp_path):
+    """
+    root/a/empty.jpg (빈 파일), root/a/color.jpg
+    root/a/b/c/empty.jpg (빈 파일)
+    root/done/end, root/done/inner/end (완료된 폴더 안의 완료된 폴더)
+    root/.DS_Store
+    """
+    root = tmp_path / "root"
+    (root / "a" / "b" / "c").mkdir(parents=True)
+    (root / "a" / "empty.jpg").write_bytes(b"")
+    (root / "a" / "color.jpg").write_bytes(b"color")
+    (root / "a" / "b" / "c" / "empty.jpg").write_bytes(b"")
+    (root / "done" / "inner").mkdir(parents=True)
+    (root / "done" / "end").write_text("end")
+    (root / "done" / "inner" / "end").write_text("end")
+    (root / ".DS_Store").write_bytes(b"")
+    return root
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_find_empty_file(tree, workers):
+    found = DirectoryUtil().find_empty_file(str(tree), workers)
+
+    assert sorted(found) == [str(tree / "a" / "b" / "c" / "empty.jpg"), str(tree / "a" / "empty.jpg")]
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_find_target_file_skips_ds_store(tree, workers):
+    found = DirectoryUtil().find_target_file(str(tree), workers)
+
+    assert sorted(found) == sorted(str(path) for path in tree.rglob("*") if path.is_file() and path.name != ".DS_Store")
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_find_download_ended_dir_does_not_descend_into_match(tree, workers):
+    found = DirectoryUtil().find_download_ended_dir(str(tree), workers)
+
+    assert list(found) == [str(tree / "done")]
+
+
+def test_walk_is_lazy_and_handles_missing_root(tree):
+    walker = DirectoryUtil().find_target_file(str(tree))
+
+    assert next(walker)
+    assert list(DirectoryUtil().find_target_file(str(tree / "missing"))) == []
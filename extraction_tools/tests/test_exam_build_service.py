@@ -0,0 +1,111 @@
+import pytest
+from sqlalchemy import event
+
+from benchmarks.fixtures import make_sqlite_orm, seed_exam, seed_difficulty
+from src.extraction_tools.service.exam_build_service import ExamBuildService
+
+
+@pytest.fixture
+def target_orm(tmp_path):
+    orm = make_sqlite_orm(str(tmp_path / "target.db"))
+    seed_difficulty(orm)
+    yield orm
+    orm._engine.dispose()
+
+
+def _round_trip(source_orm, target_orm, tmp_path, bulk: bool) -> tuple[list[str], list[str]]:
+    # source export -> target merge -> target export
+    source_path, target_path = tmp_path / "source.ndjson", tmp_path / "target.ndjson"
+    ExamBuildService(source_orm).export_exam_data(str(source_path))
+    service = ExamBuildService(target_orm)
+    service.merge_exam_data(service.load_exam_data(str(source_path)), batch_size=7, bulk=bulk)
+    ExamBuildService(target_orm).export_exam_data(str(target_path))
+    return source_path.read_text().splitlines(), target_path.read_text().splitlines()
+
+
+@pytest.mark.parametrize("bulk", [True, False])
+def test_merge_exam_data_round_trip(sqlite_orm, target_orm, tmp_path, bulk):
+    seed_exam(sqlite_orm, questions=20)
+
+    source, target = _round_trip(sqlite_orm, target_orm, tmp_path, bulk)
+
+    assert len(source) == 20
+    assert target == source
+
+
+def test_bulk_merge_without_consecutive_auto_increment(sqlite_orm, target_orm, tmp_path, monkeypatch):
+    # RETURNING 이 없고 auto increment 가 연속이 아닌 MySQL 과 같이 한 행씩 insert 하는 경우
+    seed_exam(sqlite_orm, questions=20)
+    monkeypatch.setattr(target_orm._engine.dialect, "insert_returning", False)
+    target_orm._consecutive_auto_increment = False
+    inserts = []
+    event.listen(target_orm._engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statement.startswith("INSERT") and inserts.append(statement))
+
+    source, target = _round_trip(sqlite_orm, target_orm, tmp_path, bulk=True)
+
+    assert target == source
+    # batch (7, 7, 6 문제) 마다 language, question, question_data, option, option_data 를 한번씩
+    assert len(inserts) == 3 * 5
+
+
+def test_iter_exam_data_does_not_share_streaming_connection(sqlite_orm):
+    # MySQL (pymysql) 의 스트리밍 커서가 열린 connection 에 다른 쿼리 (selectinload) 를 보내면 나머지 결과가 버려진다
+    seed_exam(sqlite_orm, questions=20)
+    streaming, shared = set(), []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        dbapi_connection = conn.connection.dbapi_connection
+        if dbapi_connection in streaming:
+            shared.append(statement)
+        if context.execution_options.get("stream_results"):
+            streaming.add(dbapi_connection)
+
+    event.listen(sqlite_orm._engine, "before_cursor_execute", on_execute)
+    questions = list(ExamBuildService(sqlite_orm).iter_exam_data(batch_size=7))
+
+    assert len(questions) == 20
+    assert shared == []
+
+
+def test_merge_exam_data_rolls_back_failed_batch(sqlite_orm, target_orm, tmp_path, monkeypatch):
+    seed_exam(sqlite_orm, questions=5)
+    path = tmp_path / "source.ndjson"
+    ExamBuildService(sqlite_orm).export_exam_data(str(path))
+    service = ExamBuildService(target_orm)
+    make_option = service.make_option
+    calls = []
+
+    def failing_make_option(*args):
+        # batch 의 세번째 문제에서 실패
+        calls.append(args)
+        if len(calls) == 3:
+            raise RuntimeError("just Test")
+        return make_option(*args)
+
+    monkeypatch.setattr(service, "make_option", failing_make_option)
+
+    with pytest.raises(RuntimeError):
+        service.merge_exam_data(service.load_exam_data(str(path)), batch_size=5)
+
+    with target_orm._engine.connect() as conn:
+        for table in "question", "question_data", "option", "language":
+            assert conn.exec_driver_sql(f"SELECT COUNT(*) FROM {table}").scalar() == 0
+
+
+@pytest.mark.parametrize("bulk", [True, False])
+def test_merge_exam_data_interns_repeated_texts(sqlite_orm, target_orm, tmp_path, bulk):
+    # 옵션 텍스트 (option0 ~ option3) 는 문제마다, batch 마다 반복된다
+    seed_exam(sqlite_orm, questions=20)
+    with target_orm._engine.begin() as conn:
+        conn.exec_driver_sql("INSERT INTO language (kr, en, created_at) VALUES ('option0', '', '2024-01-01')")
+
+    _round_trip(sqlite_orm, target_orm, tmp_path, bulk)
+
+    with target_orm._engine.connect() as conn:
+        counts = dict(conn.exec_driver_sql("SELECT kr, COUNT(*) FROM language GROUP BY kr").all())
+        option_text_seqs = conn.exec_driver_sql("SELECT COUNT(DISTINCT included_text_seq) FROM option").scalar()
+    # 제목 20 + 해설 20 + 옵션 4
+    assert len(counts) == 44
+    assert set(counts.values()) == {1}
+    assert option_text_seqs == 4
@@ -0,0 +1,45 @@
+import asyncio
+from datetime import datetime
+
+import paramiko
+import pytest
+
+from src.extraction_tools.dto.Record import IssueTagRecord
+from src.extraction_tools.infra.transfer_manifest import TransferManifest
+from src.extraction_tools.service.image_upload_service import ImageUploadService
+from src.extraction_tools.util.directory_util import DirectoryUtil
+
+
+@pytest.fixture
+def sample_issues(remote_root) -> list[IssueTagRecord]:
+    issues = [IssueTagRecord(f"I{i}", 0, f"T{i}", datetime(2024, 1, 1)) for i in range(5)]
+    for issue in issues:
+        for position in "top", "side":
+            directory = remote_root / "samples" / issue.issue_code / position
+            directory.mkdir(parents=True)
+            (directory / "color.jpg").write_bytes(b"jpg" * 100)
+    return issues
+
+
+@pytest.fixture
+def stat_calls(monkeypatch) -> list[str]:
+    calls = []
+    stat = paramiko.SFTPClient.stat
+    monkeypatch.setattr(paramiko.SFTPClient, "stat", lambda self, path: calls.append(path) or stat(self, path))
+    return calls
+
+
+@pytest.mark.parametrize("use_tar", [True, False])
+def test_validate_sample_images_with_manifest_does_not_stat(sample_issues, ssh_client_factory, stat_calls,
+                                                            tmp_path, monkeypatch, use_tar):
+    monkeypatch.chdir(tmp_path)
+    output = tmp_path / "output"
+    output.mkdir()
+    client = ssh_client_factory(manifest=TransferManifest(str(tmp_path / "manifest.db")))
+    service = ImageUploadService(DirectoryUtil(), client, None)
+
+    for _ in range(2):
+        asyncio.run(service._validate_sample_images([sample_issues], "samples", str(output), use_tar))
+
+    assert len(list(output.iterdir())) == 10
+    assert stat_calls == []
@@ -0,0 +1,139 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.pool import QueuePool
+
+from benchmarks.fixtures import QueryCounter, seed_difficulty, seed_issues
+from src.extraction_tools.infra.async_orm import AsyncORM
+from src.extraction_tools.infra.orm import ORM
+from src.extraction_tools.infra.schema import Language, Difficulty, DifficultyEnum, Issue, IssueTagMatch, Question
+
+
+@pytest.mark.parametrize("url", ["sqlite://", "sqlite:///:memory:"])
+def test_orm_accepts_in_memory_sqlite(url):
+    orm = ORM("", "", "", 0, "", url=url)
+
+    with orm._engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT 1").scalar() == 1
+    orm._engine.dispose()
+
+
+def test_orm_applies_pool_size_to_queue_pool(tmp_path):
+    orm = ORM("", "", "", 0, "", url=f"sqlite:///{tmp_path / 'pool.db'}", pool_size=3, max_overflow=2)
+
+    assert isinstance(orm._engine.pool, QueuePool)
+    assert orm._engine.pool.size() == 3
+    assert orm._engine.pool._max_overflow == 2
+    orm._engine.dispose()
+
+
+def test_async_orm_accepts_in_memory_sqlite():
+    async def run():
+        orm = AsyncORM("", "", "", 0, "", url="sqlite+aiosqlite://")
+        async with orm._engine.connect() as conn:
+            result = await conn.exec_driver_sql("SELECT 1")
+        await orm.dispose()
+        return result.scalar()
+
+    assert asyncio.run(run()) == 1
+
+
+def test_select_inserted_keys_skips_interleaved_rows(sqlite_orm, monkeypatch):
+    # innodb_autoinc_lock_mode = 2 에서 다른 session 의 행이 사이에 들어간 경우 (MySQL 의 lastrowid 는 첫번째 행)
+    now = datetime.now()
+    rows = [{"kr": f"text{i}", "en": "", "created_at": now} for i in range(3)]
+    with sqlite_orm._engine.begin() as conn:
+        conn.execute(insert(Language.__table__), [
+            {"seq": 9, **rows[1]},
+            {"seq": 10, **rows[0]},
+            {"seq": 11, "kr": "other", "en": "", "created_at": now},
+            {"seq": 12, **rows[1]},
+            {"seq": 14, **rows[2]},
+        ])
+    monkeypatch.setattr(sqlite_orm._engine.dialect, "name", "mysql")
+
+    with sqlite_orm.unit_of_work(commit=False) as session:
+        keys = ORM._select_inserted_keys(session, Language.__table__, Language.__table__.c.seq, 10, rows)
+
+    assert keys == [10, 12, 14]
+
+
+def test_reference_rows_are_read_once(sqlite_orm):
+    seqs = seed_difficulty(sqlite_orm)
+    counter = QueryCounter(sqlite_orm)
+
+    names = [sqlite_orm.get_difficulty_name(seq) for seq in seqs]
+    assert [sqlite_orm.get_difficulty_seq(name) for name in names] == seqs
+    assert names == list(DifficultyEnum)
+    assert sqlite_orm.get_difficulty_seq("없음") is None
+    # 분리된 row 이므로 unit_of_work 안에서도 그대로 사용할 수 있다
+    with sqlite_orm.unit_of_work(commit=False):
+        assert sqlite_orm.get_reference_rows(Difficulty)[0].name == DifficultyEnum.상
+
+    assert counter.reset() == 1
+
+
+def test_invalidate_reference_cache(sqlite_orm):
+    seed_difficulty(sqlite_orm)
+    sqlite_orm.get_reference_rows(Difficulty)
+    with sqlite_orm._engine.begin() as conn:
+        conn.execute(insert(Difficulty.__table__).values(name=DifficultyEnum.하, created_at=datetime.now()))
+
+    assert len(sqlite_orm.get_reference_rows(Difficulty)) == 3
+    sqlite_orm.invalidate_reference_cache(Language)
+    assert len(sqlite_orm.get_reference_rows(Difficulty)) == 3
+    sqlite_orm.invalidate_reference_cache(Difficulty)
+    assert len(sqlite_orm.get_reference_rows(Difficulty)) == 4
+    sqlite_orm.invalidate_reference_cache()
+    assert Difficulty not in sqlite_orm._reference_cache
+
+
+def test_iter_issue_pages_resumes_after_id(sqlite_orm):
+    # 이슈 10개 x 회전 3개 = 30행
+    seed_issues(sqlite_orm, 10, datetime(2024, 1, 1))
+
+    pages = list(sqlite_orm.iter_issue_pages(page_size=10))
+    assert [len(page) for page in pages] == [10, 10, 10]
+    ids = [issue.id for page in pages for issue in page]
+    assert ids == sorted(ids) and len(set(ids)) == 30
+
+    # 두번째 페이지에서 중단된 경우 마지막 id 로 이어서 조회
+    resumed = list(sqlite_orm.iter_issue_pages(page_size=10, after_id=pages[1][-1].id))
+    assert [issue.id for page in resumed for issue in page] == ids[20:]
+    assert list(sqlite_orm.iter_issue_pages(after_id=ids[-1])) == []
+
+
+def test_iter_pages_with_where(sqlite_orm):
+    seed_issues(sqlite_orm, 10, datetime(2024, 1, 1))
+
+    pages = list(sqlite_orm.iter_issue_pages(where=Issue.rotate == 0, page_size=4))
+    assert [len(page) for page in pages] == [4, 4, 2]
+    assert [issue.issue_code for page in pages for issue in page] == [f"I{i}" for i in range(10)]
+
+    after_id = pages[0][-1].id
+    resumed = sqlite_orm.iter_issue_pages(where=Issue.rotate == 0, page_size=4, after_id=after_id)
+    assert [issue.issue_code for page in resumed for issue in page] == [f"I{i}" for i in range(4, 10)]
+
+    matches = list(sqlite_orm.iter_issue_tag_match_pages(where=IssueTagMatch.tag_code == "T3", page_size=2))
+    assert [[match.issue_code for match in page] for page in matches] == [["I3", "I3_45"], ["I3_90"]]
+
+
+def test_iter_by_created_at_range_matches_single_query(sqlite_orm):
+    # 하루 단위로 나누어 조회해도 자정의 행이 두번 나오거나 빠지지 않는다
+    start = datetime(2024, 1, 1)
+    seed_issues(sqlite_orm, 50, start)
+    end = start + timedelta(hours=48)
+
+    partitions = list(sqlite_orm.iter_sample_data_by_created_at_range(start, end, 7, compact=True))
+
+    assert [issue for partition in partitions for issue in partition] == \
+        sqlite_orm.get_sample_data_by_created_at_range(start, end, compact=True)
+    assert all(len(partition) <= 7 for partition in partitions)
+
+
+def test_make_sqlite_orm_does_not_change_schema(sqlite_orm):
+    # made_by 기본값은 테스트용 테이블에만 적용된다
+    assert Question.__table__.c.made_by.server_default is None
+    assert not Question.__table__.c.made_by.nullable
@@ -0,0 +1,88 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.extraction_tools.util.metrics import METRICS
+from src.extraction_tools.util.pipeline import Pipeline, Stage
+
+
+async def _async_range(count: int):
+    for i in range(count):
+        await asyncio.sleep(0)
+        yield i
+
+
+def test_pipeline_shuts_down_with_multiple_workers_and_batches():
+    batches, results = [], []
+
+    async def batch(items: list[int]) -> list[int]:
+        batches.append(items)
+        await asyncio.sleep(0)
+        return items
+
+    async def double(item: int) -> list[int]:
+        await asyncio.sleep(0)
+        return [item * 2]
+
+    async def collect(item: int) -> list[int]:
+        results.append(item)
+        return [item]
+
+    count = asyncio.run(asyncio.wait_for(Pipeline(range(100), [
+        Stage("batch", batch, workers=3, batch_size=8, queue_size=2),
+        Stage("double", double, workers=4, queue_size=2),
+        Stage("collect", collect, workers=2, queue_size=2),
+    ]).run(), timeout=10))
+
+    assert count == 100
+    assert sorted(results) == [i * 2 for i in range(100)]
+    assert all(1 <= len(items) <= 8 for items in batches)
+    assert sorted(item for items in batches for item in items) == list(range(100))
+
+
+def test_pipeline_skips_item_when_stage_raises():
+    METRICS.reset()
+
+    async def fail_on_three(item: int) -> list[int]:
+        if item == 3:
+            raise ValueError("broken item")
+        return [item]
+
+    count = asyncio.run(Pipeline(range(10), [Stage("check", fail_on_three, workers=2)], name="test").run())
+
+    assert count == 9
+    counters = {(c["name"], c["labels"].get("stage")): c["value"] for c in METRICS.snapshot()["counters"]}
+    assert counters[("stage_errors_total", "test.check")] == 1
+
+
+def test_pipeline_stage_returning_none_passes_nothing():
+    async def drop(item: int) -> None:
+        return None
+
+    assert asyncio.run(Pipeline(range(5), [Stage("drop", drop), Stage("never", drop)]).run()) == 0
+
+
+@pytest.mark.parametrize("source_type", ["sync", "async"])
+def test_pipeline_sync_and_async_sources(source_type):
+    main_thread = threading.get_ident()
+    source_threads = set()
+    results = []
+
+    def sync_source():
+        for i in range(20):
+            source_threads.add(threading.get_ident())
+            yield i
+
+    async def collect(item: int) -> list[int]:
+        results.append(item)
+        return [item]
+
+    source = sync_source() if source_type == "sync" else _async_range(20)
+    count = asyncio.run(Pipeline(source, [Stage("collect", collect)]).run())
+
+    assert count == 20
+    assert results == list(range(20))
+    if source_type == "sync":
+        # 동기 source 는 이벤트 루프를 막지 않도록 작업 스레드에서 읽는다
+        assert main_thread not in source_threads
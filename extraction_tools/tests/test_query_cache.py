@@ -0,0 +1,80 @@
+from datetime import datetime
+
+from benchmarks.fixtures import seed_issues, QueryCounter
+from src.extraction_tools.infra.orm import ORM
+from src.extraction_tools.infra.query_cache import QueryCache
+
+
+def test_default_methods_exclude_large_and_mutable_results():
+    assert "get_issue_by_tag_type" not in ORM.QUERY_CACHE_TTL
+    assert "get_tag_index" not in ORM.QUERY_CACHE_TTL
+
+
+def test_cached_orm_methods_skip_repeated_queries(sqlite_orm):
+    seed_issues(sqlite_orm, 5, datetime(2024, 1, 1))
+    cache = QueryCache()
+    sqlite_orm.enable_query_cache(cache)
+    queries = QueryCounter(sqlite_orm)
+
+    first = [sqlite_orm.get_barcode_by_issue_code("I1"), sqlite_orm.get_barcode_by_issue_code("nothing"),
+             sqlite_orm.get_tag_by_tag_code("B1"), sqlite_orm.get_all_issue_count()]
+    assert queries.reset() == 4
+    second = [sqlite_orm.get_barcode_by_issue_code("I1"), sqlite_orm.get_barcode_by_issue_code("nothing"),
+              sqlite_orm.get_tag_by_tag_code("B1"), sqlite_orm.get_all_issue_count()]
+
+    assert queries.reset() == 0
+    assert second == first
+    assert first[1] is None
+    stats = cache.stats()
+    assert stats["ORM.get_barcode_by_issue_code"] == {"hits": 2, "misses": 2, "size": 2}
+    assert stats["ORM.get_all_issue_count"] == {"hits": 1, "misses": 1, "size": 1}
+
+
+def test_cached_results_are_not_shared_between_callers():
+    calls = []
+
+    def lookup(codes: set[str]) -> dict[str, int]:
+        calls.append(codes)
+        return {code: len(code) for code in codes}
+
+    cached = QueryCache().cached(lookup, "lookup")
+    first = cached({"a", "bb"})
+    first["changed"] = 0
+    second = cached({"bb", "a"})
+    second["changed"] = 1
+
+    assert cached({"a", "bb"}) == {"a": 1, "bb": 2}
+    assert len(calls) == 1
+
+
+def test_invalidate_and_save_clear_cache(sqlite_orm):
+    seed_issues(sqlite_orm, 5, datetime(2024, 1, 1))
+    sqlite_orm.enable_query_cache(QueryCache())
+    queries = QueryCounter(sqlite_orm)
+
+    sqlite_orm.get_all_issue_count()
+    sqlite_orm.invalidate_query_cache("get_all_issue_count")
+    sqlite_orm.get_all_issue_count()
+    assert queries.reset() == 2
+
+    with sqlite_orm.unit_of_work():
+        pass
+    sqlite_orm.get_all_issue_count()
+    assert queries.reset() == 1
+
+
+def test_disk_cache_is_reused_by_next_run(sqlite_orm, tmp_path):
+    seed_issues(sqlite_orm, 5, datetime(2024, 1, 1))
+    path = str(tmp_path / "query_cache.db")
+    first_run = QueryCache(path=path)
+    sqlite_orm.enable_query_cache(first_run)
+    expected = sqlite_orm.get_tag_by_tag_code("T1")
+    first_run.close()
+
+    next_orm = ORM("", "", "", 0, "", url=str(sqlite_orm._engine.url))
+    next_orm.enable_query_cache(QueryCache(path=path))
+    queries = QueryCounter(next_orm)
+
+    assert next_orm.get_tag_by_tag_code("T1") == expected
+    assert queries.reset() == 0
+    next_orm._engine.dispose()
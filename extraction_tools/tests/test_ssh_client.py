@@ -0,0 +1,141 @@
+import asyncio
+import os
+import shutil
+
+import pytest
+
+from src.extraction_tools.client.ssh_client import SSHClient
+
+
+def _make_files(root, directory: str, count: int, size: int = 256) -> list[str]:
+    (root / directory).mkdir(parents=True)
+    paths = []
+    for i in range(count):
+        (root / directory / f"{i}.bin").write_bytes(bytes([i % 256]) * size)
+        paths.append(f"{directory}/{i}.bin")
+    return paths
+
+
+async def _download_all(client: SSHClient, paths: list[str], local_dir) -> list[bool]:
+    return await asyncio.gather(*(client.download(path, str(local_dir / path.replace("/", "_"))) for path in paths))
+
+
+def test_concurrent_download_over_multiple_transports(remote_root, ssh_client_factory, tmp_path):
+    paths = _make_files(remote_root, "files", 200)
+    local_dir = tmp_path / "local"
+    local_dir.mkdir()
+    client = ssh_client_factory(max_channels=8, max_transports=3)
+
+    results = asyncio.run(_download_all(client, paths, local_dir))
+
+    assert all(results)
+    assert len(client._transports) == 3
+    assert len(list(local_dir.iterdir())) == 200
+
+
+def _fake_busybox_find(tmp_path, monkeypatch):
+    # -printf 를 지원하지 않는 find (아무것도 출력하지 않고 1 로 끝난다)
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    find = bin_dir / "find"
+    find.write_text("#!/bin/sh\nexit 1\n")
+    find.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}:{os.environ['PATH']}")
+
+
+def test_list_remote_tree_raises_without_find_printf(remote_root, ssh_client_factory, tmp_path, monkeypatch):
+    _make_files(remote_root, "images/a", 2)
+    _fake_busybox_find(tmp_path, monkeypatch)
+    client = ssh_client_factory()
+
+    with pytest.raises(FileNotFoundError):
+        client.list_remote_tree(["images/a"])
+
+
+def test_folder_download_many_falls_back_without_find_printf(remote_root, ssh_client_factory, tmp_path,
+                                                             monkeypatch):
+    for img_id in "a", "b":
+        _make_files(remote_root, f"images/{img_id}", 3)
+    _fake_busybox_find(tmp_path, monkeypatch)
+    client = ssh_client_factory()
+
+    asyncio.run(client.folder_download_many("images/", f"{tmp_path}/local/", ["a", "b"]))
+
+    assert sorted(os.listdir(tmp_path / "local" / "a")) == ["0.bin", "1.bin", "2.bin"]
+    assert sorted(os.listdir(tmp_path / "local" / "b")) == ["0.bin", "1.bin", "2.bin"]
+
+
+def test_exists_many_uses_one_find_per_batch(remote_root, ssh_client_factory, monkeypatch):
+    paths = _make_files(remote_root, "files", 10)
+    client = ssh_client_factory()
+    calls = []
+    list_remote_tree = client.list_remote_tree
+    monkeypatch.setattr(client, "list_remote_tree", lambda *args: calls.append(args) or list_remote_tree(*args))
+
+    existing = asyncio.run(client.exists_many([*paths, "files/missing.bin", "nothing/color.jpg"], batch_size=8))
+
+    assert existing == set(paths)
+    assert len(calls) == 2
+
+
+def test_exists_many_falls_back_to_listdir(remote_root, ssh_client_factory, tmp_path, monkeypatch):
+    paths = _make_files(remote_root, "files", 3)
+    _fake_busybox_find(tmp_path, monkeypatch)
+    client = ssh_client_factory()
+
+    existing = asyncio.run(client.exists_many([*paths, "files/missing.bin", "nothing/color.jpg"]))
+
+    assert existing == set(paths)
+
+
+def test_tar_download_renames_members_to_targets(remote_root, ssh_client_factory, tmp_path):
+    for issue_code in "I0", "I1":
+        (remote_root / "samples" / issue_code / "top").mkdir(parents=True)
+        (remote_root / "samples" / issue_code / "top" / "color.jpg").write_bytes(issue_code.encode() * 10)
+    absolute = remote_root / "absolute.jpg"
+    absolute.write_bytes(b"absolute")
+    local_dir = tmp_path / "local"
+    local_dir.mkdir()
+    targets = {
+        "samples/I0/top/color.jpg": str(local_dir / "T0_color_0_top_I0.jpg"),
+        "samples/I1/top/color.jpg": str(local_dir / "T1_color_0_top_I1.jpg"),
+        # tar 는 절대 경로의 앞 "/" 를 지우고 저장한다
+        str(absolute): str(local_dir / "absolute.jpg"),
+        "samples/I2/top/color.jpg": str(local_dir / "missing.jpg"),
+    }
+    client = ssh_client_factory()
+
+    downloaded, pending = client._tar_download(targets)
+
+    assert downloaded == set(list(targets)[:3])
+    assert pending == []
+    assert (local_dir / "T0_color_0_top_I0.jpg").read_bytes() == b"I0" * 10
+    assert (local_dir / "T1_color_0_top_I1.jpg").read_bytes() == b"I1" * 10
+    assert (local_dir / "absolute.jpg").read_bytes() == b"absolute"
+    assert sorted(os.listdir(local_dir)) == ["T0_color_0_top_I0.jpg", "T1_color_0_top_I1.jpg", "absolute.jpg"]
+
+
+def test_bulk_download_retries_rest_of_broken_tar_stream(remote_root, ssh_client_factory, tmp_path, monkeypatch):
+    paths = _make_files(remote_root, "files", 5)
+    # 첫번째 파일 (헤더 512 + 데이터 512) 과 두번째 파일의 헤더까지만 보내고 끊기는 tar
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    tar = bin_dir / "tar"
+    tar.write_text(f"#!/bin/sh\n{shutil.which('tar')} \"$@\" | head -c 1536\n")
+    tar.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}:{os.environ['PATH']}")
+    local_dir = tmp_path / "local"
+    local_dir.mkdir()
+    targets = {path: str(local_dir / path.replace("/", "_")) for path in paths}
+    client = ssh_client_factory()
+
+    downloaded, pending = client._tar_download(targets)
+    assert downloaded == {paths[0]}
+    assert pending == paths[1:]
+
+    downloaded = asyncio.run(client.bulk_download(targets))
+
+    assert downloaded == set(paths)
+    assert sorted(os.listdir(local_dir)) == sorted(path.replace("/", "_") for path in paths)
+    for path in paths:
+        assert (local_dir / path.replace("/", "_")).read_bytes() == (remote_root / path).read_bytes()
@@ -0,0 +1,42 @@
+import pytest
+
+from src.extraction_tools.infra.transfer_manifest import TransferManifest
+
+
+@pytest.fixture
+def local_file(tmp_path):
+    path = tmp_path / "color.jpg"
+    path.write_bytes(b"original")
+    return path
+
+
+@pytest.mark.parametrize("checksum", [True, False])
+def test_is_transferred_with_same_size_and_mtime(tmp_path, local_file, checksum):
+    manifest = TransferManifest(str(tmp_path / "manifest.db"), checksum=checksum)
+    manifest.record("remote/color.jpg", str(local_file), 8, 100.5)
+
+    assert manifest.is_transferred("remote/color.jpg", str(local_file), 8, 100.5)
+    assert not manifest.is_transferred("remote/color.jpg", str(local_file), 8, 200)
+    manifest.close()
+
+
+def test_is_transferred_detects_corrupted_file_with_checksum(tmp_path, local_file):
+    manifest = TransferManifest(str(tmp_path / "manifest.db"), checksum=True)
+    manifest.record("remote/color.jpg", str(local_file), 8, 100)
+    # 크기는 그대로인 손상
+    local_file.write_bytes(b"corrupt!")
+
+    assert not manifest.is_transferred("remote/color.jpg", str(local_file), 8, 100)
+    manifest.close()
+
+
+def test_is_transferred_without_recorded_checksum(tmp_path, local_file):
+    # checksum 없이 기록한 매니페스트를 checksum 을 켜고 사용하면 다시 전송한다
+    path = str(tmp_path / "manifest.db")
+    manifest = TransferManifest(path)
+    manifest.record("remote/color.jpg", str(local_file), 8, 100)
+    manifest.close()
+
+    manifest = TransferManifest(path, checksum=True)
+    assert not manifest.is_transferred("remote/color.jpg", str(local_file), 8, 100)
+    manifest.close()
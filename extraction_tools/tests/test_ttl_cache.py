@@ -0,0 +1,171 @@
+import pytest
+
+from src.extraction_tools.util import ttl_cache
+from src.extraction_tools.util.ttl_cache import TTLCache, DiskTTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(ttl_cache.time, "monotonic", clock)
+    monkeypatch.setattr(ttl_cache.time, "time", clock)
+    return clock
+
+
+@pytest.fixture(params=["memory", "disk"])
+def make_cache(request, tmp_path):
+    caches = []
+
+    def factory(max_size: int = 1024, ttl: float | None = 60.0, namespace: str = "test"):
+        if request.param == "memory":
+            return TTLCache(max_size=max_size, ttl=ttl)
+        cache = DiskTTLCache(str(tmp_path / "cache.db"), namespace=namespace, max_size=max_size, ttl=ttl)
+        caches.append(cache)
+        return cache
+
+    yield factory
+    for cache in caches:
+        cache.close()
+
+
+def test_lru_evicts_least_recently_used(make_cache, clock):
+    cache = make_cache(max_size=2)
+    cache.set("a", 1)
+    clock.now += 1
+    cache.set("b", 2)
+    clock.now += 1
+    assert cache.get("a") == 1
+    clock.now += 1
+    cache.set("c", 3)
+
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_ttl_expires_entries(make_cache, clock):
+    cache = make_cache(ttl=10)
+    cache.set("a", 1)
+
+    clock.now += 10
+    assert cache.get("a") == 1
+    clock.now += 1
+    assert cache.get("a", "expired") == "expired"
+    assert len(cache) == 0
+
+
+def test_ttl_none_never_expires(make_cache, clock):
+    cache = make_cache(ttl=None)
+    cache.set("a", 1)
+    clock.now += 10 ** 9
+
+    assert cache.get("a") == 1
+
+
+def test_hits_misses_and_invalidate(make_cache):
+    cache = make_cache()
+    cache.set(("k", 1), [1, 2])
+    cache.set(("k", 2), None)
+
+    assert cache.get(("k", 1)) == [1, 2]
+    assert cache.get(("k", 2), "missing") is None
+    assert cache.get(("k", 3)) is None
+    assert (cache.hits, cache.misses) == (2, 1)
+
+    cache.invalidate(("k", 1))
+    assert cache.get(("k", 1)) is None
+    cache.invalidate()
+    assert len(cache) == 0
+
+
+def test_disk_cache_persists_across_instances(tmp_path):
+    path = str(tmp_path / "cache.db")
+    first = DiskTTLCache(path, namespace="a")
+    first.set("key", {"value": 1})
+    first.close()
+
+    second = DiskTTLCache(path, namespace="a")
+    other = DiskTTLCache(path, namespace="b")
+
+    assert second.get("key") == {"value": 1}
+    assert other.get("key") is None
+    second.close()
+    other.close()
+
+
+def test_disk_cache_skips_unpicklable_values(tmp_path):
+    cache = DiskTTLCache(str(tmp_path / "cache.db"))
+    cache.set("key", lambda: None)
+
+    assert cache.get("key") is None
+    assert len(cache) == 0
+    cache.close()
+
+
+def test_disk_cache_hits_do_not_write(tmp_path, clock):
+    cache = DiskTTLCache(str(tmp_path / "cache.db"), max_size=10, commit_interval=100)
+    cache.set("key", 1)
+    statements = []
+    cache._conn.set_trace_callback(statements.append)
+
+    for _ in range(50):
+        clock.now += 1
+        assert cache.get("key") == 1
+
+    assert all(statement.startswith("SELECT") for statement in statements)
+    cache.close()
+
+
+def test_disk_cache_flushes_used_at_on_close(tmp_path, clock):
+    path = str(tmp_path / "cache.db")
+    first = DiskTTLCache(path, max_size=2, ttl=None)
+    first.set("a", 1)
+    clock.now += 1
+    first.set("b", 2)
+    clock.now += 1
+    first.get("a")
+    first.close()
+
+    second = DiskTTLCache(path, max_size=2, ttl=None)
+    second.set("c", 3)
+
+    assert second.get("a") == 1
+    assert second.get("b") is None
+    second.close()
+
+
+def test_disk_cache_evicts_in_batches(tmp_path, clock):
+    cache = DiskTTLCache(str(tmp_path / "cache.db"), max_size=20, ttl=None)
+    deletes = []
+    cache._conn.set_trace_callback(lambda statement: deletes.append(statement) if "DELETE" in statement else None)
+
+    for i in range(100):
+        clock.now += 1
+        cache.set(i, i)
+
+    assert len(cache) <= 20
+    # 넘치면 max_size 의 9/10 (18개) 까지 한번에 지운다 (21, 24, ..., 99 번째 저장에서만 삭제)
+    assert len(deletes) == 27
+    assert cache.get(99) == 99
+    assert cache.get(0) is None
+    cache.close()
+
+
+def test_disk_cache_creates_used_at_index(tmp_path):
+    cache = DiskTTLCache(str(tmp_path / "cache.db"))
+
+    plan = cache._conn.execute(
+        "EXPLAIN QUERY PLAN SELECT key FROM cache WHERE namespace = ? ORDER BY used_at LIMIT 1", ("",)
+    ).fetchall()
+
+    assert any("cache_used_at" in row[-1] for row in plan)
+    cache.close()
@@ -1,9 +1,35 @@
+import atexit
+import json
 import os
-from datetime import datetime
-from logging import getLogger, StreamHandler, FileHandler, Logger, Formatter
+import queue
+from logging import getLogger, StreamHandler, Handler, Logger, Formatter, LogRecord
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
 
+# 설정이 끝난 logger { position: QueueListener }
+_listeners: dict[str, QueueListener] = {}
 
-def custom_logger(position: str, level: str):
+
+class JsonFormatter(Formatter):
+    """
+    한 줄에 로그 하나씩 JSON 으로 기록한다 (JSON lines)
+        {"time": "...", "level": "INFO", "name": "position", "msg": "..."}
+    """
+    def format(self, record: LogRecord) -> str:
+        log = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "name": record.name,
+            "msg": record.getMessage()
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            log["exc"] = record.exc_text
+        return json.dumps(log, ensure_ascii=False, separators=(",", ":"))
+
+
+def custom_logger(position: str, level: str, rotation: str = "time", when: str = "midnight",
+                  max_bytes: int = 10 * 1024 * 1024, backup_count: int = 7, json_format: bool = False):
     """
     Logger name 'position'
     Logger lavel 'level'
@@ -15,28 +41,62 @@ def custom_logger(position: str, level: str):
         'INFO': INFO,
         'DEBUG': DEBUG,
         'NOTSET': NOTSET,
+    rotation: 'time' 이면 when 마다 (기본 자정), 'size' 이면 max_bytes 를 넘을 때 log/{position}.log 를 교체한다
+    backup_count: 남겨둘 이전 로그 파일 수
+    json_format: True 이면 한 줄에 JSON 하나씩 기록한다
+    로그는 queue 에 넣기만 하고, 출력과 파일 기록은 QueueListener 스레드에서 진행한다
+    같은 position 으로 다시 호출하면 handler 를 추가하지 않고 level 만 바꾼다
     """
+    logger: Logger = getLogger(position)
+    logger.setLevel(level)
+    if position in _listeners:
+        return logger
+
     path = os.getcwd() + "/log"
     if not os.path.exists(path):
         os.makedirs(path, )
-    logger: Logger = getLogger(position)
-    logger.setLevel(level)
 
-    formatter: Formatter = Formatter(
-        'Time: %(asctime)-19s Call: %(name)s \n\t - Level: %(levelname)-s - MSG: %(message)s')
+    if json_format:
+        formatter: Formatter = JsonFormatter()
+    else:
+        formatter: Formatter = Formatter(
+            'Time: %(asctime)-19s Call: %(name)s \n\t - Level: %(levelname)-s - MSG: %(message)s')
     stream_handler: StreamHandler = StreamHandler()
     stream_handler.setFormatter(formatter)
 
-    file_handler: FileHandler = FileHandler(filename=(path + "/" + str(datetime.now().date())
-                                                      + "_" + position + ".log"), mode="a")
+    filename = path + "/" + position + ".log"
+    if rotation == "size":
+        file_handler: Handler = RotatingFileHandler(filename=filename, mode="a", maxBytes=max_bytes,
+                                                    backupCount=backup_count, encoding="utf-8")
+    elif rotation == "time":
+        file_handler: Handler = TimedRotatingFileHandler(filename=filename, when=when, backupCount=backup_count,
+                                                         encoding="utf-8")
+    else:
+        raise ValueError(f"rotation must be 'time' or 'size': {rotation}")
     file_handler.setFormatter(formatter)
 
-    logger.addHandler(stream_handler)
-    logger.addHandler(file_handler)
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, stream_handler, file_handler, respect_handler_level=True)
+    listener.start()
+    _listeners[position] = listener
 
+    # stop_loggers 뒤에 다시 설정하는 경우 이전 queue 의 handler 를 지운다
+    for handler in [handler for handler in logger.handlers if isinstance(handler, QueueHandler)]:
+        logger.removeHandler(handler)
+    logger.addHandler(QueueHandler(log_queue))
     return logger
 
 
+@atexit.register
+def stop_loggers():
+    # 남은 로그를 모두 기록하고 listener 스레드를 종료한다
+    while _listeners:
+        _, listener = _listeners.popitem()
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+
 if __name__ == '__main__':
     logger = custom_logger(position="test", level="DEBUG")
     logger.info("test")